@@ -0,0 +1,183 @@
+"""Offline benchmark of the translation pipeline on synthetic workbooks.
+
+Generates previous/new workbook pairs in the shape of test_data/test_data_new.xlsx, runs each
+pipeline stage on its own and then the full pipeline against the fake translator, and reports
+rows/s, characters/s, peak memory and per-stage timings.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --rows 1000,10000 --sheets 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from openpyxl import Workbook
+from excel_translate.backends import FakeTranslator
+from excel_translate.cache import TranslationCache
+from excel_translate.excel_utils import read_excel, iter_excel, preprocess_sheets, ExcelStreamWriter
+from excel_translate.fingerprint import RowIndex, sidecar_path
+from excel_translate.pipeline import (process_files, process_sheet, DEFAULT_REMOVE_LIST, SOURCE_COLUMNS,
+                                      TRANSLATE_COLUMNS)
+from excel_translate.snapshot import snapshot_dir
+from excel_translate.translator import translate_workbook
+from excel_translate.xlsx_scan import iter_xlsx_columns
+
+HEADER = ['日期', '负责人', '视频类型', '产品名', 'ASIN', '模特要求', '视频数量', '场景', '宠物, 孩子',
+          '简单要求 / 产品重点（英文）', '产品图片', '备注 / 不可拍模特']
+PRODUCTS = ['吸尘器', '咖啡机', '电动牙刷', '智能音箱', '空气净化器', '电饭煲', '吹风机', '加湿器', '榨汁机', '电热水壶']
+SCENES = ['indoor', 'outdoor', '厨房', '客厅', '浴室', '卧室', None]
+REQUIREMENTS = ['强力吸尘', '便携式设计', '清洁力强', '静音运行', '大容量', '一键操作', '快速加热', None]
+COMMENTS = ['不可用模特', '需要儿童模特', '避免宠物', None, None, None]
+OWNERS = ['Alice', 'Bob', 'Charlie', 'Dana']
+MODELS = ['成人', '儿童', '无', None]
+PETS = ['cat, dog', 'kid', None]
+
+
+def _row(rng, i):
+    product = f"{rng.choice(PRODUCTS)} {rng.randint(1, max(2, i // 20))}型"
+    return [f"2025-03-{rng.randint(1, 28):02d}", rng.choice(OWNERS), rng.choice(['教程', '展示', '使用演示']),
+            product, f"B0{rng.randint(10**7, 10**8 - 1)}", rng.choice(MODELS), rng.randint(1, 5),
+            rng.choice(SCENES), rng.choice(PETS), rng.choice(REQUIREMENTS), f"image{i}.jpg", rng.choice(COMMENTS)]
+
+
+def make_workbook_pair(directory, sheets, rows, new_fraction=0.1, seed=0):
+    """Write previous/new workbooks; the new one adds new_fraction more rows to the end of each sheet."""
+    rng = random.Random(seed)
+    previous, new = Workbook(write_only=True), Workbook(write_only=True)
+    for s in range(sheets):
+        data = [_row(rng, i) for i in range(rows)]
+        cutoff = int(rows * (1 - new_fraction))
+        ws_prev, ws_new = previous.create_sheet(f"品类{s}"), new.create_sheet(f"品类{s}")
+        ws_prev.append(HEADER)
+        ws_new.append(HEADER)
+        for i, row in enumerate(data):
+            if i < cutoff:
+                ws_prev.append(row)
+            ws_new.append(row)
+
+    pre_path = os.path.join(directory, f"prev_{sheets}x{rows}.xlsx")
+    new_path = os.path.join(directory, f"new_{sheets}x{rows}.xlsx")
+    previous.save(pre_path)
+    new.save(new_path)
+    return pre_path, new_path
+
+
+def _timed(timings, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+
+def bench_stages(pre_path, new_path, output_path):
+    """Time each stage on its own, in the order the pipeline runs them."""
+    timings = {}
+    _timed(timings, 'read_excel (pandas)', read_excel, new_path, SOURCE_COLUMNS)
+    _timed(timings, 'scan previous (xlsx_scan)', lambda: list(iter_xlsx_columns(pre_path, SOURCE_COLUMNS)))
+    new_df = _timed(timings, 'read new (iter_excel)', lambda: dict(iter_excel(new_path, SOURCE_COLUMNS)))
+    new_df = _timed(timings, 'preprocess_sheets', preprocess_sheets, new_df, DEFAULT_REMOVE_LIST)
+    pre_index = _timed(timings, 'row index', lambda: RowIndex.from_frames(
+        dict(iter_xlsx_columns(pre_path, SOURCE_COLUMNS))))
+
+    def transform():
+        processed = {}
+        for sheet, df in new_df.items():
+            processed_df = process_sheet(sheet, df, pre_index)
+            if processed_df is not None and not processed_df.empty:
+                processed[sheet] = processed_df
+        return processed
+
+    processed = _timed(timings, 'process_sheet', transform)
+    _timed(timings, 'translate (fake)', translate_workbook, processed, TRANSLATE_COLUMNS, FakeTranslator(),
+           cache=TranslationCache(':memory:'), workers=4)
+
+    def write():
+        with ExcelStreamWriter(output_path) as writer:
+            for sheet, df in processed.items():
+                writer.write_sheet(sheet, df)
+
+    _timed(timings, 'writer', write)
+    return timings
+
+
+def _run_pipeline(pre_path, new_path, output_path, fake, workers, processes):
+    # Each pass must parse both workbooks, not reuse what the previous pass saved
+    for sidecar in (sidecar_path(pre_path), sidecar_path(new_path)):
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+    shutil.rmtree(snapshot_dir(output_path), ignore_errors=True)
+    return process_files(pre_path, new_path, output_path, translator=fake, workers=workers,
+                         cache_path=':memory:', processes=processes)
+
+
+def bench_end_to_end(pre_path, new_path, output_path, latency, workers, processes):
+    """Run process_files against the fake translator and report throughput and peak memory.
+
+    The pipeline runs twice: once for timing, and once under tracemalloc for peak memory, since
+    tracing allocations slows Python down too much to time the same run.
+    """
+    fake = FakeTranslator(latency=latency)
+    start = time.perf_counter()
+    ok = _run_pipeline(pre_path, new_path, output_path, fake, workers, processes)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    _run_pipeline(pre_path, new_path, output_path, FakeTranslator(), workers, processes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = sum(len(df) for _, df in iter_xlsx_columns(new_path, SOURCE_COLUMNS))
+    return {
+        'ok': ok,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed,
+        'characters_sent': fake.characters,
+        'characters_per_second': fake.characters / elapsed,
+        'requests': fake.requests,
+        'peak_memory_mb': peak / 2 ** 20,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1000,10000", help="comma-separated rows per sheet to benchmark")
+    parser.add_argument("--sheets", type=int, default=5, help="sheets per workbook")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake translator latency per request (s)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent translation requests")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes for the transform stage")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in (int(r) for r in args.rows.split(',')):
+            pre_path, new_path = make_workbook_pair(directory, args.sheets, rows)
+            output_path = os.path.join(directory, 'output.xlsx')
+            timings = bench_stages(pre_path, new_path, output_path)
+            summary = bench_end_to_end(pre_path, new_path, output_path, args.latency, args.workers,
+                                       args.processes)
+            results.append({'sheets': args.sheets, 'rows_per_sheet': rows, 'stages': timings, **summary})
+
+            print(f"\n{args.sheets} sheets x {rows} rows")
+            for stage, seconds in timings.items():
+                print(f"  {stage:<28}{seconds:>9.3f} s")
+            print(f"  {'end to end':<28}{summary['seconds']:>9.3f} s  "
+                  f"{summary['rows_per_second']:,.0f} rows/s  {summary['characters_per_second']:,.0f} chars/s  "
+                  f"peak {summary['peak_memory_mb']:.1f} MiB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
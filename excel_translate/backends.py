@@ -0,0 +1,173 @@
+import time
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import deepl
+
+BACKENDS = ('deepl', 'fake')
+
+
+class TextResult:
+    """Translation result with the same shape as deepl.TextResult."""
+
+    def __init__(self, text, detected_source_lang=''):
+        self.text = text
+        self.detected_source_lang = detected_source_lang
+
+
+class UsageDetail:
+    def __init__(self, count, limit):
+        self.count = count
+        self.limit = limit
+
+
+class Usage:
+    """Account usage with the same shape as deepl.Usage, as far as the pipeline reads it."""
+
+    def __init__(self, character_count, character_limit):
+        self.character = UsageDetail(character_count, character_limit)
+
+
+class TranslatorBackend:
+    """Interface the translation layer relies on.
+
+    deepl.Translator satisfies it as is; any other backend needs translate_text() taking a list of
+    texts and returning objects with a .text attribute in the same order, and get_usage().
+    """
+
+    def translate_text(self, text, *, target_lang, source_lang=None, formality=None, **kwargs):
+        raise NotImplementedError
+
+    def get_usage(self):
+        raise NotImplementedError
+
+
+class FakeTranslator(TranslatorBackend):
+    """Offline stand-in for DeepL with configurable latency, failures and throughput limits.
+
+    Translations are deterministic ("[EN-US] text"), so output can be compared between runs.
+    Requests beyond requests_per_second raise TooManyRequestsException, and a random error_rate
+    fraction fail with a retryable 503, which exercises the retry and rate-limiting paths.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, requests_per_second=None,
+                 character_limit=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests_per_second = requests_per_second
+        self.character_limit = character_limit
+        self.requests = 0
+        self.characters = 0
+        self._random = random.Random(seed)
+        self._window = []
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            self.requests += 1
+            if self.requests_per_second:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.requests_per_second:
+                    raise deepl.TooManyRequestsException("Too many requests", should_retry=True,
+                                                         http_status_code=429)
+                self._window.append(now)
+            if self._random.random() < self.error_rate:
+                raise deepl.DeepLException("Service unavailable", should_retry=True, http_status_code=503)
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def translate_text(self, text, *, target_lang, source_lang=None, formality=None, **kwargs):
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        delay = self._admit()
+        if delay:
+            time.sleep(delay)
+
+        size = sum(len(t) for t in texts)
+        with self._lock:
+            if self.character_limit is not None and self.characters + size > self.character_limit:
+                raise deepl.QuotaExceededException("Quota for this billing period has been exceeded",
+                                                   http_status_code=456)
+            self.characters += size
+
+        results = [TextResult(f"[{target_lang.upper()}] {t}", source_lang or 'ZH') for t in texts]
+        return results[0] if single else results
+
+    def get_usage(self):
+        return Usage(self.characters, self.character_limit)
+
+
+def create_translator(backend='deepl', auth_key=None, **options):
+    """Build a translator for the named backend."""
+    if backend == 'deepl':
+        # Requests are retried through the rate limiter; retries inside the client would multiply
+        # its attempts and escape its pacing
+        deepl.http_client.max_network_retries = 0
+        return deepl.Translator(auth_key)
+    if backend == 'fake':
+        return FakeTranslator(**options)
+    raise ValueError(f"Unknown translator backend: {backend}")
+
+
+class CoalescingTranslator(TranslatorBackend):
+    """Wraps a translator so concurrent requests for the same text share one upstream call.
+
+    Each text of a request is claimed while it is in flight. A request for a text already claimed
+    by another thread (same source and target language and formality) waits for that call's
+    result instead of sending it again; a request made up only of such texts sends nothing. If the
+    claiming call fails, the waiting requests fail with the same error and are retried as usual.
+
+    The last `recent` results are kept as well: rate limiting spaces requests out, so a duplicate
+    from a concurrent job often arrives just after the first copy came back, before its job has
+    stored it in the translation cache.
+    """
+
+    def __init__(self, translator, recent=10_000):
+        self.translator = translator
+        self.recent = recent
+        self.coalesced = 0
+        self._in_flight = {}
+        self._done = OrderedDict()
+        self._lock = threading.Lock()
+
+    def translate_text(self, text, *, target_lang, source_lang=None, formality=None, **kwargs):
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        options = (source_lang, target_lang.upper(), formality)
+        claimed, futures = [], {}
+        with self._lock:
+            for t in dict.fromkeys(texts):
+                future = self._in_flight.get((t, options)) or self._done.get((t, options))
+                if future is None:
+                    future = self._in_flight[(t, options)] = Future()
+                    claimed.append(t)
+                else:
+                    self.coalesced += 1
+                futures[t] = future
+
+        if claimed:
+            try:
+                translated = self.translator.translate_text(claimed, target_lang=target_lang, source_lang=source_lang,
+                                                            formality=formality, **kwargs)
+                for t, result in zip(claimed, translated):
+                    futures[t].set_result(result)
+            except BaseException as e:
+                for t in claimed:
+                    futures[t].set_exception(e)
+                with self._lock:
+                    for t in claimed:
+                        del self._in_flight[(t, options)]
+                raise
+            with self._lock:
+                for t in claimed:
+                    self._done[(t, options)] = self._in_flight.pop((t, options))
+                while len(self._done) > self.recent:
+                    self._done.popitem(last=False)
+
+        results = [futures[t].result() for t in texts]
+        return results[0] if single else results
+
+    def get_usage(self):
+        return self.translator.get_usage()
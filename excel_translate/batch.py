@@ -0,0 +1,252 @@
+"""Translate many (previous, new) workbook pairs in one session.
+
+Pairs come from a manifest or from a watched folder. All of them share one translator, so the
+DeepL connection is reused, one open translation memory and rate limiter, and one transform
+process pool, instead of paying for each again per workbook.
+"""
+import os
+import csv
+import sys
+import json
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from excel_translate.backends import create_translator
+from excel_translate.cache import TranslationCache, DEFAULT_CACHE_PATH
+from excel_translate.ratelimit import RateLimiter
+from excel_translate.metrics import Metrics
+from excel_translate.fingerprint import sidecar_path
+from excel_translate.pipeline import process_files, create_transform_pool, DEFAULT_PROCESSES
+from excel_translate.cli import (add_run_options, configure_logging, check_run_options, remove_list, AUTH_KEY_ENV,
+                                 EXIT_OK, EXIT_FAILURE, EXIT_USAGE)
+
+WorkbookPair = namedtuple('WorkbookPair', ['previous', 'new', 'output'])
+
+# Subfolders of a watched folder: workbooks arrive in inbox/ and are diffed against the file of the
+# same name in previous/, which they replace once translated; failed ones are moved to failed/
+INBOX, PREVIOUS, OUTPUT, FAILED = 'inbox', 'previous', 'output', 'failed'
+DEFAULT_POLL_SECONDS = 30.0
+
+
+def default_output(new_file_loc):
+    stem, ext = os.path.splitext(new_file_loc)
+    return f"{stem}_translated{ext or '.xlsx'}"
+
+
+def read_manifest(path):
+    """Read the workbook pairs listed in a CSV manifest, or a JSON list of objects.
+
+    Each entry names its previous, new and, optionally, output file; the output defaults to
+    <new>_translated.xlsx. Relative paths are resolved against the manifest's folder.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        entries = json.load(f) if path.lower().endswith('.json') else list(csv.DictReader(f))
+    base = os.path.dirname(os.path.abspath(path))
+    pairs = []
+    for number, entry in enumerate(entries, 1):
+        entry = {key.strip().lower(): (value or '').strip() for key, value in entry.items() if key}
+        if not entry.get('previous') or not entry.get('new'):
+            raise ValueError(f"{path}: entry {number} needs both a previous and a new file")
+        previous, new = (os.path.join(base, entry[key]) for key in ('previous', 'new'))
+        output = os.path.join(base, entry['output']) if entry.get('output') else default_output(new)
+        pairs.append(WorkbookPair(previous, new, output))
+    return pairs
+
+
+class BatchRunner:
+    """Runs process_files over workbook pairs with shared translator, cache, limiter and process pool.
+
+    options are passed on to every process_files call. Each pair still gets its own checkpoint and
+    character budget; its metrics are logged as usual and added to the batch totals in metrics.
+    Setting cancel, a threading.Event, stops the current pair as in process_files and the batch
+    after it.
+    """
+
+    def __init__(self, auth_key=None, backend='deepl', cache_path=DEFAULT_CACHE_PATH, processes=DEFAULT_PROCESSES,
+                 translator=None, metrics_path=None, cancel=None, **options):
+        dry_run = options.get('dry_run', False)
+        if translator is None and (options.get('check_usage') or not dry_run):
+            translator = create_translator(backend, auth_key)
+        self.translator = translator
+        self.backend = backend
+        self.processes = processes
+        self.metrics_path = metrics_path
+        self.cancel = cancel if cancel is not None else threading.Event()
+        self.options = options
+        self.metrics = Metrics()
+        self.cache = TranslationCache(cache_path)
+        self.limiter = RateLimiter()
+        self.transform_pool = create_transform_pool(processes) if processes > 1 else None
+
+    def run(self, pair):
+        """Process one pair. Returns True only when its output was written with every text translated."""
+        logging.info(f"Batch: {pair.new} against {pair.previous}")
+        metrics = Metrics()
+        ok = process_files(pair.previous, pair.new, pair.output, translator=self.translator, backend=self.backend,
+                           processes=self.processes, metrics=metrics, cache=self.cache, limiter=self.limiter,
+                           transform_pool=self.transform_pool, cancel=self.cancel, **self.options)
+        self.metrics.merge(metrics.to_dict())
+        self.metrics.count('workbooks_processed' if ok else 'workbooks_failed')
+        return ok
+
+    def run_all(self, pairs):
+        """Process pairs in order and return the ones that failed."""
+        failed = []
+        for pair in pairs:
+            if self.cancel.is_set():
+                break
+            if not self.run(pair):
+                failed.append(pair)
+        return failed
+
+    def close(self):
+        if self.transform_pool is not None:
+            self.transform_pool.shutdown()
+        self.limiter.log_stats()
+        self.cache.close()
+        self.metrics.log_summary()
+        if self.metrics_path:
+            try:
+                self.metrics.export(self.metrics_path)
+            except OSError as e:
+                logging.error(f"Could not write metrics to {self.metrics_path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _move(path, folder):
+    """Move a workbook and its row index sidecar, if any, into folder."""
+    target = os.path.join(folder, os.path.basename(path))
+    os.replace(path, target)
+    if os.path.exists(sidecar_path(path)):
+        os.replace(sidecar_path(path), sidecar_path(target))
+    elif os.path.exists(sidecar_path(target)):
+        os.remove(sidecar_path(target))
+    return target
+
+
+def _inbox_workbooks(inbox):
+    return sorted(os.path.join(inbox, name) for name in os.listdir(inbox)
+                  if name.lower().endswith('.xlsx') and not name.startswith('~$'))
+
+
+def watch_folder(runner, root, poll_seconds=DEFAULT_POLL_SECONDS, once=False):
+    """Translate workbooks as they arrive in root/inbox until runner.cancel is set.
+
+    A workbook is picked up once its size and mtime are unchanged between two polls, so files still
+    being copied are left alone. It is diffed against previous/<name>, written to output/<name> and
+    then becomes previous/<name> for the next delivery. Only a workbook whose every text was
+    translated is promoted: one that failed or kept source text (failed chunks, quota, budget) is
+    moved to failed/ and previous/ is left alone, so the next delivery is still diffed against the
+    last complete one and the missing rows count as new again. Dropping it back into the inbox
+    resumes it from its checkpoint. Workbooks without a previous version are
+    skipped with a warning until one is placed in previous/. With once, the workbooks already in
+    the inbox are processed without waiting and the function returns the number that failed.
+    Dry runs are refused: they write no output, yet would promote the workbook.
+    """
+    if runner.options.get('dry_run'):
+        raise ValueError("Watch mode cannot be combined with a dry run")
+    folders = {name: os.path.join(root, name) for name in (INBOX, PREVIOUS, OUTPUT, FAILED)}
+    for folder in folders.values():
+        os.makedirs(folder, exist_ok=True)
+    logging.info(f"Watching {folders[INBOX]} for new workbooks...")
+    cancel = runner.cancel
+    seen = {}
+    warned = set()
+    failures = 0
+    while not cancel.is_set():
+        for path in _inbox_workbooks(folders[INBOX]):
+            if cancel.is_set():
+                break
+            stat = os.stat(path)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            settled = seen.get(path) == stamp
+            seen[path] = stamp
+            if not (once or settled):
+                continue
+            name = os.path.basename(path)
+            previous = os.path.join(folders[PREVIOUS], name)
+            if not os.path.exists(previous):
+                if (path, stamp) not in warned:
+                    logging.warning(f"Skipping {name}: no previous version in {folders[PREVIOUS]}.")
+                    warned.add((path, stamp))
+                continue
+            ok = runner.run(WorkbookPair(previous, path, os.path.join(folders[OUTPUT], name)))
+            if cancel.is_set() and not ok:
+                break  # leave the workbook in the inbox to resume from its checkpoint
+            if ok:
+                _move(path, folders[PREVIOUS])
+            else:
+                logging.error(f"{name} was not fully translated; moved to {folders[FAILED]}, "
+                              f"{previous} stays the version new deliveries are diffed against.")
+                _move(path, folders[FAILED])
+            seen.pop(path, None)
+            failures += not ok
+        if once:
+            break
+        cancel.wait(poll_seconds)
+    return failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m excel_translate.batch",
+        description="Translate many workbook pairs with one shared translator, cache and worker pool.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", metavar="FILE",
+                        help="CSV (previous,new,output columns) or JSON list of the workbook pairs to process")
+    source.add_argument("--watch", metavar="DIR",
+                        help=f"process workbooks dropped into DIR/{INBOX} against DIR/{PREVIOUS}, "
+                             f"writing to DIR/{OUTPUT}")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="seconds between inbox scans with --watch (default: %(default)s)")
+    parser.add_argument("--once", action="store_true",
+                        help="with --watch, process the current inbox and exit instead of watching")
+    add_run_options(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args)
+
+    auth_key = os.environ.get(AUTH_KEY_ENV)
+    if not check_run_options(args, auth_key):
+        return EXIT_USAGE
+
+    if args.watch and args.dry_run:
+        logging.error("--dry-run cannot be used with --watch: it would replace previous/ workbooks "
+                      "without translating them.")
+        return EXIT_USAGE
+
+    if args.manifest:
+        try:
+            pairs = read_manifest(args.manifest)
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Could not read manifest: {e}")
+            return EXIT_USAGE
+
+    runner = BatchRunner(auth_key=auth_key, backend=args.backend, cache_path=args.cache, processes=args.processes,
+                         metrics_path=args.metrics, rem_list=remove_list(args), workers=args.workers,
+                         dry_run=args.dry_run, char_budget=args.budget, check_usage=args.check_usage,
+                         target_langs=args.target_lang.split(','), output_mode=args.output_mode,
+                         latin_lang=args.latin_lang)
+    with runner:
+        try:
+            if args.manifest:
+                failed = len(runner.run_all(pairs))
+            else:
+                failed = watch_folder(runner, args.watch, args.poll, args.once)
+        except KeyboardInterrupt:
+            logging.warning("Batch interrupted.")
+            return EXIT_FAILURE
+    return EXIT_OK if not failed else EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
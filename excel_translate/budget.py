@@ -0,0 +1,52 @@
+import logging
+import threading
+
+
+class CharacterBudget:
+    """Hard cap on the characters one run may send for translation.
+
+    Every chunk reserves its characters before it is sent. The first chunk that would overshoot
+    the cap exhausts the budget: nothing more is sent, and the remaining texts keep their source
+    text exactly as if their chunks had failed.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.skipped = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def reserve(self, characters, count=1):
+        """Claim characters for a chunk of count texts; False means the chunk must not be sent."""
+        with self._lock:
+            if not self.exhausted and self.used + characters <= self.limit:
+                self.used += characters
+                return True
+            if not self.exhausted:
+                logging.warning(f"Character budget of {self.limit:,} reached, stopping translation.")
+                self.exhausted = True
+            self.skipped += count
+            return False
+
+    def log_stats(self):
+        logging.info(f"Character budget: {self.used:,} of {self.limit:,} characters used"
+                     + (f", {self.skipped} texts left untranslated." if self.skipped else "."))
+
+
+def remaining_characters(translator):
+    """Characters left in the current billing period according to translator.get_usage().
+
+    Returns None when the account has no character limit or the usage cannot be fetched.
+    """
+    try:
+        character = translator.get_usage().character
+    except Exception as e:
+        logging.warning(f"Could not fetch translator usage: {e}")
+        return None
+    if character is None or character.count is None or not character.limit:
+        return None
+    remaining = max(0, character.limit - character.count)
+    logging.info(f"Translator usage: {character.count:,} of {character.limit:,} characters used, "
+                 f"{remaining:,} left.")
+    return remaining
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".excel_translate", "translation_memory.sqlite")
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+class TranslationCache:
+    """Persistent translation memory keyed by (text, source lang, target lang, formality)."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source_text TEXT NOT NULL,"
+            " source_lang TEXT NOT NULL,"
+            " target_lang TEXT NOT NULL,"
+            " formality TEXT NOT NULL,"
+            " translated_text TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (source_text, source_lang, target_lang, formality))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key_parts(source_lang, target_lang, formality):
+        return (source_lang or "", target_lang.upper(), formality or "")
+
+    def get_many(self, texts, target_lang, source_lang=None, formality=None):
+        """Return a {text: translation} dict for every text already in the cache."""
+        src, tgt, form = self._key_parts(source_lang, target_lang, formality)
+        found = {}
+        texts = list(texts)
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(texts), 500):
+                batch = texts[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT source_text, translated_text FROM translations "
+                    f"WHERE source_lang = ? AND target_lang = ? AND formality = ? "
+                    f"AND source_text IN ({placeholders})",
+                    (src, tgt, form, *batch),
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? "
+                    "WHERE source_text = ? AND source_lang = ? AND target_lang = ? AND formality = ?",
+                    [(now, text, src, tgt, form) for text in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, translations, target_lang, source_lang=None, formality=None):
+        """Store a {text: translation} dict and evict the least recently used entries."""
+        if not translations:
+            return
+        src, tgt, form = self._key_parts(source_lang, target_lang, formality)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(source_text, source_lang, target_lang, formality, translated_text, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(text, src, tgt, form, translated, now) for text, translated in translations.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logging.info(f"Translation cache evicted {excess} least recently used entries.")
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        logging.info(f"Translation cache: {self.hits} hits, {self.misses} misses ({ratio:.1f}% hit rate).")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+
+
+def run_key(*parts):
+    """Combine the inputs that define a run (file digests, settings) into one key."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class Checkpoint:
+    """Append-only journal of translated chunks for one run, used to resume after a crash.
+
+    Each completed chunk is flushed to disk straight away. A rerun with the same run key
+    replays the journal so nothing already paid for is sent again; a journal written for
+    different inputs is discarded.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.resumed = 0
+        self._translations = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path) and self._load():
+            logging.info(f"Resuming from checkpoint {path}: {self.resumed} texts already translated.")
+
+        # Rewrite the journal compactly, which also drops any torn lines
+        self._file = open(f"{path}.tmp", 'w', encoding='utf-8')
+        self._write({'run': key})
+        for (target_lang, formality), translations in self._translations.items():
+            self._write({'target_lang': target_lang, 'formality': formality, 'translations': translations})
+        self._file.close()
+        os.replace(f"{path}.tmp", path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('run') != self.key:
+                    logging.info(f"Discarding checkpoint {self.path} from a different run.")
+                    return False
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn line from an interrupted write
+                    bucket = self._translations.setdefault((entry['target_lang'], entry['formality']), {})
+                    bucket.update(entry['translations'])
+                    self.resumed += len(entry['translations'])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            self._translations.clear()
+            self.resumed = 0
+            return False
+        return True
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def get_many(self, texts, target_lang, source_lang=None, formality=None):
+        bucket = self._translations.get((target_lang.upper(), formality or ''), {})
+        return {text: bucket[text] for text in texts if text in bucket}
+
+    def put_many(self, translations, target_lang, source_lang=None, formality=None):
+        if not translations:
+            return
+        with self._lock:
+            key = (target_lang.upper(), formality or '')
+            self._translations.setdefault(key, {}).update(translations)
+            self._write({'target_lang': key[0], 'formality': key[1], 'translations': translations})
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def complete(self):
+        """Close and remove the journal once the run's output has been written."""
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,104 @@
+import os
+import sys
+import argparse
+import logging
+from excel_translate.translator import DEFAULT_WORKERS
+from excel_translate.cache import DEFAULT_CACHE_PATH
+from excel_translate.backends import BACKENDS
+from excel_translate.pipeline import (process_files, DEFAULT_REMOVE_LIST, DEFAULT_PROCESSES, DEFAULT_TARGET_LANGS,
+                                      OUTPUT_MODES)
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+AUTH_KEY_ENV = "DEEPL_AUTH_KEY"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m excel_translate.cli",
+        description="Translate the new rows of an Excel workbook with DeepL, without the GUI.")
+    parser.add_argument("previous", help="previously processed Excel file, used to skip old rows")
+    parser.add_argument("new", help="new Excel file to process")
+    parser.add_argument("output", help="output Excel file")
+    add_run_options(parser)
+    return parser
+
+
+def add_run_options(parser):
+    """Options shared by the single-file and batch command lines."""
+    parser.add_argument("--remove", default=",".join(DEFAULT_REMOVE_LIST),
+                        help="comma-separated columns/sheets to remove (default: %(default)s)")
+    parser.add_argument("--target-lang", default=",".join(DEFAULT_TARGET_LANGS),
+                        help="comma-separated target languages, e.g. EN-US,DE,JA (default: %(default)s)")
+    parser.add_argument("--latin-lang", metavar="LANG",
+                        help="language of plain Latin-script cells too short to detect, e.g. EN; cells detected "
+                             "as the target language are left as they are (default: let DeepL detect them)")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default="workbooks",
+                        help="with several target languages, write one workbook per language "
+                             "or one workbook with a column per language (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="concurrent translation requests (default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="worker processes for the sheet transform stage (default: %(default)s)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="translation memory location (default: %(default)s)")
+    parser.add_argument("--backend", choices=BACKENDS, default="deepl",
+                        help="translation backend; 'fake' runs offline without an API key (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report the characters that would be sent per sheet and column, without translating")
+    parser.add_argument("--budget", type=int, metavar="CHARS",
+                        help="stop translating once this many characters have been sent")
+    parser.add_argument("--check-usage", action="store_true",
+                        help="fetch the account's usage first and cap the budget at the characters left")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write run metrics to PATH, as Prometheus text for .prom files and JSON otherwise")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings and errors")
+
+
+def configure_logging(args):
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def check_run_options(args, auth_key):
+    """Log and return False if the shared options are unusable."""
+    if args.backend == "deepl" and not auth_key and (args.check_usage or not args.dry_run):
+        logging.error(f"Set the {AUTH_KEY_ENV} environment variable to your DeepL API key.")
+        return False
+
+    if args.workers < 1 or args.processes < 1:
+        logging.error("--workers and --processes must be at least 1.")
+        return False
+
+    if args.budget is not None and args.budget < 0:
+        logging.error("--budget must not be negative.")
+        return False
+    return True
+
+
+def remove_list(args):
+    return [item.strip() for item in args.remove.split(',') if item.strip()]
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args)
+
+    auth_key = os.environ.get(AUTH_KEY_ENV)
+    if not check_run_options(args, auth_key):
+        return EXIT_USAGE
+
+    rem_list = remove_list(args)
+
+    ok = process_files(args.previous, args.new, args.output, auth_key=auth_key, rem_list=rem_list,
+                       workers=args.workers, cache_path=args.cache, processes=args.processes, backend=args.backend,
+                       metrics_path=args.metrics, dry_run=args.dry_run, char_budget=args.budget,
+                       check_usage=args.check_usage, target_langs=args.target_lang.split(','),
+                       output_mode=args.output_mode, latin_lang=args.latin_lang)
+    return EXIT_OK if ok else EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,18 @@
+import os
+import hashlib
 import pandas as pd
 import logging
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import column_index_from_string
+from excel_translate.metrics import timed
+
+try:
+    import pyarrow  # noqa: F401
+    # Arrow-backed strings: compact storage and vectorised string operations
+    STRING_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    STRING_DTYPE = pd.StringDtype()
 
 def read_excel(file_path, columns=None):
     try:
@@ -11,6 +24,142 @@ def read_excel(file_path, columns=None):
         logging.error(f"Error reading {file_path}: {e}")
         return None
 
+def parse_usecols(columns):
+    """Turn an Excel column spec like "D:J,L" into sorted 0-based column positions."""
+    positions = set()
+    for part in columns.split(','):
+        start, _, end = part.strip().partition(':')
+        first = column_index_from_string(start.strip())
+        last = column_index_from_string(end.strip()) if end else first
+        positions.update(range(first - 1, last))
+    return sorted(positions)
+
+
+def _header_names(values):
+    return [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(values)]
+
+
+def _rows_to_frame(header, rows, start):
+    df = pd.DataFrame.from_records(rows, columns=header) if rows else pd.DataFrame(columns=header)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df.infer_objects()
+
+
+def iter_excel(file_path, columns=None, chunk_rows=None):
+    """Lazily yield (sheet, DataFrame) pairs using openpyxl's read-only mode.
+
+    Only one sheet (or one chunk of chunk_rows rows, when given) is held in memory at a time,
+    so callers can start working on the first sheet before the rest of the file is parsed.
+    The first row of each sheet is used as the header; fully empty rows are skipped.
+    """
+    positions = parse_usecols(columns) if columns else None
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            # Read-only mode trusts the sheet's stored dimension, which some writers leave stale
+            ws.reset_dimensions()
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            if positions is not None:
+                header = [header[i] if i < len(header) else None for i in positions]
+            header = _header_names(header)
+
+            batch = []
+            start = 0
+            for row in rows:
+                if positions is not None:
+                    row = tuple(row[i] if i < len(row) else None for i in positions)
+                if all(value is None for value in row):
+                    continue
+                batch.append(row)
+                if chunk_rows and len(batch) >= chunk_rows:
+                    yield ws.title, _rows_to_frame(header, batch, start)
+                    start += len(batch)
+                    batch = []
+            if batch or not start:
+                yield ws.title, _rows_to_frame(header, batch, start)
+    finally:
+        wb.close()
+
+
+def _cell_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ExcelStreamWriter:
+    """Constant-memory workbook writer built on openpyxl's write-only mode.
+
+    Rows are streamed to temporary storage as each sheet is written, so callers can drop their
+    DataFrame straight after write_sheet() instead of holding the whole workbook until close.
+    A workbook no sheet was written to is only saved while keep_empty is set; it is cleared when
+    the writer exits on an exception, so an aborted run leaves an earlier file at the path alone.
+    """
+
+    def __init__(self, file_path, metrics=None):
+        self.file_path = file_path
+        self.metrics = metrics
+        self.sheets_written = 0
+        self.keep_empty = True
+        self._wb = Workbook(write_only=True)
+
+    def write_sheet(self, sheet, df):
+        with timed(self.metrics, 'write'):
+            ws = self._wb.create_sheet(title=sheet)
+            ws.append([str(col) for col in df.columns])
+            for row in df.itertuples(index=False, name=None):
+                ws.append([_cell_value(value) for value in row])
+        self.sheets_written += 1
+        if self.metrics is not None:
+            self.metrics.count('rows_written', len(df))
+
+    def close(self):
+        if not self.sheets_written:
+            if not self.keep_empty:
+                return
+            # A workbook needs at least one sheet to be valid
+            self._wb.create_sheet()
+        # Saved beside the target first, so a failed save does not leave a truncated file there
+        partial = f"{self.file_path}.partial"
+        try:
+            with timed(self.metrics, 'save'):
+                self._wb.save(partial)
+            os.replace(partial, self.file_path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        if self.metrics is not None:
+            self.metrics.count('bytes_written', os.path.getsize(self.file_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.keep_empty = False
+        self.close()
+
+
+def preprocess_stream(sheets, rem_list):
+    """Lazily drop unwanted sheets and columns from an iterable of (sheet, DataFrame) pairs."""
+    for sheet, df in sheets:
+        if sheet not in rem_list:
+            drop = [col for col in rem_list if col in df.columns]
+            yield sheet, df.drop(columns=drop) if drop else df
+
+
 def preprocess_sheets(new_df, rem_list):
-    return {sheet: df.drop(columns=[col for col in rem_list if col in df.columns], errors='ignore')
-            for sheet, df in new_df.items() if sheet not in rem_list}
+    return dict(preprocess_stream(new_df.items(), rem_list))
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,144 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from excel_translate.excel_utils import file_digest
+
+_META_KEY = '__meta__'
+_SHEETS_KEY = '__sheets__'
+# Bumped when the saved layout changes, so sidecars from older versions are rebuilt
+SIDECAR_FORMAT = 2
+
+
+def _normalise(df):
+    """Render every cell as a string so the same content hashes the same across reads."""
+    columns = {}
+    for position, (name, col) in enumerate(df.items()):
+        if pd.api.types.is_float_dtype(col) and (col.dropna() % 1 == 0).all():
+            # Integer columns come back as float when they contain blanks
+            col = col.astype('Int64')
+        columns[position] = col.astype(object).where(col.notna(), '').astype(str)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def row_fingerprints(df):
+    """Return a uint64 content hash for each row of df."""
+    return pd.util.hash_pandas_object(_normalise(df), index=False)
+
+
+class RowIndex:
+    """Per-sheet multisets of row fingerprints used to find rows that are new or changed.
+
+    Each sheet's fingerprints are kept as a sorted array with repeats, so a row that appears
+    twice in the new workbook but once in the previous one still counts as new once.
+    """
+
+    def __init__(self, sheets=None, meta=None):
+        self.sheets = sheets or {}
+        self.meta = meta or {}
+
+    @classmethod
+    def from_frames(cls, frames):
+        index = cls()
+        for sheet, df in frames.items():
+            index.add(sheet, df)
+        return index
+
+    def add(self, sheet, df):
+        """Add the rows of df (a whole sheet or one chunk of it) to the index."""
+        self.add_hashes(sheet, row_fingerprints(df).to_numpy())
+
+    def add_hashes(self, sheet, hashes):
+        if sheet in self.sheets:
+            hashes = np.concatenate([self.sheets[sheet], hashes])
+        self.sheets[sheet] = np.sort(hashes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data[_META_KEY])) if _META_KEY in data.files else {}
+            names = data[_SHEETS_KEY].tolist() if _SHEETS_KEY in data.files else []
+            return cls({sheet: data[f"s{i}"] for i, sheet in enumerate(names)}, meta)
+
+    def save(self, path):
+        # Sheet names are stored as data, not as array names: a sheet called "file" or
+        # "allow_pickle" would otherwise clash with np.savez's own arguments.
+        # np.savez appends .npz unless the name already ends with it.
+        arrays = {f"s{i}": hashes for i, hashes in enumerate(self.sheets.values())}
+        with open(path, 'wb') as f:
+            np.savez(f, **{_META_KEY: np.array(json.dumps(self.meta)),
+                           _SHEETS_KEY: np.array(list(self.sheets), dtype=str)}, **arrays)
+
+    def __contains__(self, sheet):
+        return sheet in self.sheets
+
+    def keys(self):
+        return self.sheets.keys()
+
+    def new_rows(self, sheet, df, hashes=None):
+        """Return a boolean mask of the rows in df (a whole sheet) whose content is not in the index.
+
+        A row is new when its content occurs more often up to it than in the indexed sheet: with
+        two copies indexed, the third and later copies in df are new. hashes are df's row
+        fingerprints, if already computed.
+        """
+        if sheet not in self.sheets:
+            return pd.Series(True, index=df.index)
+        if hashes is None:
+            hashes = row_fingerprints(df).to_numpy()
+        hashes = np.asarray(hashes)
+        known = self.sheets[sheet]
+        counts = np.searchsorted(known, hashes, side='right') - np.searchsorted(known, hashes, side='left')
+        # Occurrence number of each row among the rows of df with the same content
+        order = np.argsort(hashes, kind='stable')
+        ordered = hashes[order]
+        occurrence = np.empty(len(hashes), dtype=np.int64)
+        occurrence[order] = np.arange(len(hashes)) - np.searchsorted(ordered, ordered, side='left')
+        return pd.Series(occurrence >= counts, index=df.index)
+
+
+def sidecar_path(file_path):
+    return f"{file_path}.rowindex.npz"
+
+
+def _file_stamp(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_sidecar(file_path, settings=None, digest=None):
+    """Load the row index saved next to file_path if it still describes the workbook.
+
+    The sidecar must have been built with the same settings (columns, remove list). A matching
+    size and mtime is trusted as is; otherwise the workbook's content hash decides, so a file
+    that was merely touched or copied keeps its index. digest may be passed in to avoid hashing
+    the workbook again.
+    """
+    path = sidecar_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        index = RowIndex.load(path)
+        if index.meta.get('format') != SIDECAR_FORMAT or index.meta.get('settings') != settings:
+            return None
+        stamp = _file_stamp(file_path)
+        if all(index.meta.get(key) == value for key, value in stamp.items()):
+            return index
+        if index.meta.get('sha256') == (digest or file_digest(file_path)):
+            index.meta.update(stamp)
+            index.save(path)
+            return index
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Ignoring row index {path}: {e}")
+    return None
+
+
+def save_sidecar(file_path, index, settings=None, digest=None):
+    path = sidecar_path(file_path)
+    try:
+        index.meta = {'format': SIDECAR_FORMAT, **_file_stamp(file_path), 'sha256': digest or file_digest(file_path),
+                      'settings': settings}
+        index.save(path)
+    except OSError as e:
+        logging.warning(f"Could not save row index {path}: {e}")
@@ -1,13 +1,21 @@
 import os
 import logging
-import pandas as pd
-import deepl
-from excel_translate.translator import translate_column
-from excel_translate.excel_utils import read_excel, preprocess_sheets
+from excel_translate.translator import DEFAULT_WORKERS
+from excel_translate.pipeline import process_files, DEFAULT_REMOVE_LIST, DEFAULT_TARGET_LANGS
+from excel_translate.progress import Progress, format_progress
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext
 import threading
 import queue
+from collections import deque
+
+# The log widget keeps only the newest LOG_MAX_LINES lines
+LOG_MAX_LINES = 5000
+# Log polling backs off from the fast interval towards the idle one while nothing arrives
+LOG_POLL_MIN_MS = 50
+LOG_POLL_MAX_MS = 500
+# Minimum seconds between progress updates sent by the pipeline
+PROGRESS_INTERVAL = 0.5
 
 
 class LogHandler(logging.Handler):
@@ -51,16 +59,18 @@ class ExcelProcessorApp:
         self.new_file_path = tk.StringVar()
         self.output_file_path = tk.StringVar()
         self.deepl_key = tk.StringVar()
-        self.remove_columns = tk.StringVar(value='1001总表,829主图,1001主图,汇总,401总表,409主图,5332,25549')
-
-        self.expected_columns = ['Product', 'ASIN', 'Model_Requirements', 'Total_Video', 'Scene', 'Pets',
-                                 'Requirements', 'Comments']
+        self.remove_columns = tk.StringVar(value=','.join(DEFAULT_REMOVE_LIST))
+        self.workers = tk.IntVar(value=DEFAULT_WORKERS)
+        self.target_langs = tk.StringVar(value=','.join(DEFAULT_TARGET_LANGS))
+        self.progress_text = tk.StringVar(value="Idle")
+        self.cancel_event = threading.Event()
 
         # Create GUI elements
         self.create_widgets()
 
         # Set up periodic log check
         self.after_id = None
+        self.poll_interval = LOG_POLL_MIN_MS
         self.check_logs()
 
     def create_widgets(self):
@@ -105,10 +115,33 @@ class ExcelProcessorApp:
         ttk.Entry(config_frame, textvariable=self.remove_columns, width=50).grid(row=1, column=1, sticky=tk.W + tk.E,
                                                                                  padx=5, pady=5)
 
+        # Concurrent translation requests
+        ttk.Label(config_frame, text="Concurrent Requests:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(config_frame, from_=1, to=32, textvariable=self.workers, width=5).grid(row=2, column=1,
+                                                                                           sticky=tk.W, padx=5,
+                                                                                           pady=5)
+
+        # Target languages
+        ttk.Label(config_frame, text="Target Languages:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(config_frame, textvariable=self.target_langs, width=50).grid(row=3, column=1, sticky=tk.W + tk.E,
+                                                                               padx=5, pady=5)
+
         # Process button
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
-        ttk.Button(button_frame, text="Process Excel Files", command=self.start_processing).pack(pady=10)
+        self.process_button = ttk.Button(button_frame, text="Process Excel Files", command=self.start_processing)
+        self.process_button.pack(side=tk.LEFT, expand=True, anchor=tk.E, padx=5, pady=10)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_processing,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, expand=True, anchor=tk.W, padx=5, pady=10)
+
+        # Progress bar and run statistics
+        progress_frame = ttk.LabelFrame(main_frame, text="Progress", padding=10)
+        progress_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill=tk.X)
+        ttk.Label(progress_frame, textvariable=self.progress_text).pack(anchor=tk.W, pady=(5, 0))
 
         # Log area
         log_frame = ttk.LabelFrame(main_frame, text="Log", padding=10)
@@ -142,173 +175,60 @@ class ExcelProcessorApp:
             self.output_file_path.set(file_path)
 
     def check_logs(self):
-        # Check for new log messages
-        while not self.log_queue.empty():
+        """Move queued log messages into the log area in one batch per tick.
+
+        Only the newest LOG_MAX_LINES messages of a backlog are inserted, older lines are trimmed
+        from the widget, and polling slows down while the queue stays empty. Progress snapshots
+        from the pipeline arrive on the same queue and update the progress panel.
+        """
+        batch = deque(maxlen=LOG_MAX_LINES)
+        received = 0
+        progress = None
+        for _ in range(self.log_queue.qsize()):
             try:
                 message = self.log_queue.get_nowait()
-                self.log_text.config(state=tk.NORMAL)
-                self.log_text.insert(tk.END, message + "\n")
-                self.log_text.see(tk.END)
-                self.log_text.config(state=tk.DISABLED)
             except queue.Empty:
                 break
+            if isinstance(message, dict):
+                progress = message  # Progress snapshots share the queue; only the newest matters
+                continue
+            batch.append(message)
+            received += 1
+
+        if progress is not None:
+            self.progress_bar['value'] = progress['fraction'] * 100
+            self.progress_text.set(format_progress(progress))
+
+        if batch or progress is not None:
+            self.poll_interval = LOG_POLL_MIN_MS
+        else:
+            self.poll_interval = min(LOG_POLL_MAX_MS, self.poll_interval * 2)
+
+        if batch:
+            dropped = received - len(batch)
+            text = "\n".join(batch) + "\n"
+            if dropped:
+                text = f"... {dropped} earlier log lines omitted ...\n" + text
+            self.log_text.config(state=tk.NORMAL)
+            self.log_text.insert(tk.END, text)
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+            self.log_text.config(state=tk.DISABLED)
 
         # Schedule the next check
-        self.after_id = self.root.after(100, self.check_logs)
-
-    def read_excel(self, file_path, columns=None):
-        """Read an Excel file and handle errors."""
-        try:
-            return pd.read_excel(file_path, sheet_name=None, usecols=columns)
-        except FileNotFoundError:
-            self.logger.error(f"File {file_path} not found.")
-            return None
-        except Exception as e:
-            self.logger.error(f"Error reading {file_path}: {e}")
-            return None
-
-    def preprocess_sheets(self, new_df, rem_list):
-        """Remove unwanted columns and delete unwanted sheets."""
-        return {sheet: df.drop(columns=[col for col in rem_list if col in df.columns], errors='ignore')
-                for sheet, df in new_df.items() if sheet not in rem_list}
-
-    def translate_column(self, df, column_name, translator, target_lang='EN-US'):
-        """Batch translate a column using DeepL API while handling empty values."""
-        # Ensure column exists before processing
-        if column_name not in df.columns:
-            self.logger.warning(f"Column {column_name} not found, skipping translation.")
-            return df
-
-        # Convert all values to strings and replace NaNs with an empty string
-        df[column_name] = df[column_name].astype(str).fillna('')
-
-        # Filter out empty strings before sending to DeepL
-        mask = df[column_name] != ""
-        texts_to_translate = df.loc[mask, column_name].tolist()
-
-        try:
-            if texts_to_translate:  # Ensure we don't send empty requests
-                translations = translator.translate_text(texts_to_translate, target_lang=target_lang)
-                df.loc[mask, column_name] = [t.text for t in translations]
-        except Exception as e:
-            self.logger.error(f"Error translating {column_name}: {e}")
-
-        return df
-
-    def process_sheet(self, sheet, df, pre_df, new_added_worksheets, translator):
-        """Process a single worksheet, skipping old rows and translating new data."""
-        self.logger.info(f"Processing {sheet}...")
-
-        if len(df.columns) < len(self.expected_columns):
-            self.logger.warning(f"Skipping {sheet} due to missing columns.")
-            return None
-
-        df = df.copy()  # Prevent modifications to original DataFrame
-        df.columns = self.expected_columns
-
-        if sheet not in new_added_worksheets and sheet in pre_df:
-            if not pre_df[sheet].empty:
-                last_cell = pre_df[sheet]['Product'].dropna().iloc[-1]  # Get last processed value
-
-                # Find the first occurrence of last_cell in new_df using .idxmax()
-                mask = df['Product'] == last_cell
-                if mask.any():  # Ensure last_cell exists in new_df
-                    first_new_row_index = mask.idxmax()  # Get first occurrence of last_cell
-                    df = df.iloc[first_new_row_index + 1:].copy()  # Skip processed rows efficiently
-                else:
-                    self.logger.info(f"No new rows to translate in {sheet}.")
-                    return None
-
-        # Fill missing values and concatenate fields
-        df['Model_Requirements'] = df['Model_Requirements'].fillna('N/A').copy()
-        df['Scene'] = df['Scene'].fillna('N/A').astype(str).copy()
-        df['Shooting_Requirements'] = (
-                    df['Comments'].fillna('').astype(str) + '\r' + df['Requirements'].fillna('').astype(str)).copy()
-
-        # Drop unnecessary columns
-        df = df.drop(columns=['Requirements', 'Comments'], errors='ignore')
-
-        # Translate columns safely
-        df = self.translate_column(df, 'Product', translator)
-        df = self.translate_column(df, 'Scene', translator)
-        df = self.translate_column(df, 'Shooting_Requirements', translator)
-
-        return df
+        self.after_id = self.root.after(self.poll_interval, self.check_logs)
 
     def process_files(self):
         """Process the Excel files based on GUI inputs."""
-        pre_file_loc = self.pre_file_path.get()
-        new_file_loc = self.new_file_path.get()
-        output_file = self.output_file_path.get()
-        auth_key = self.deepl_key.get()
-
         # Parse remove list
         rem_list = [item.strip() for item in self.remove_columns.get().split(',')]
 
-        self.logger.info("Starting Excel processing...")
-
-        # Validate inputs
-        if not pre_file_loc or not new_file_loc:
-            self.logger.error("Please select both previous and new Excel files.")
-            return
-
-        if not output_file:
-            self.logger.error("Please specify an output file location.")
-            return
-
-        if not auth_key:
-            self.logger.error("Please enter a DeepL API key.")
-            return
-
-        try:
-            # Initialize DeepL translator
-            translator = deepl.Translator(auth_key)
-
-            # Read Excel files
-            self.logger.info(f"Reading previous file: {pre_file_loc}")
-            pre_df = self.read_excel(pre_file_loc, "D")
-            if pre_df is None:
-                return
-
-            self.logger.info(f"Reading new file: {new_file_loc}")
-            new_df = self.read_excel(new_file_loc, "D:J,L")
-            if new_df is None:
-                return
-
-            # Rename the column in all sheets
-            for sheet in pre_df:
-                pre_df[sheet].columns = ['Product']
-
-            # Preprocess: Remove unnecessary sheets
-            self.logger.info("Preprocessing sheets...")
-            new_df = self.preprocess_sheets(new_df, rem_list)
-
-            # Compare worksheet names
-            pre_worksheets = set(pre_df.keys())
-            new_worksheets = set(new_df.keys())
-            new_added_worksheets = new_worksheets - pre_worksheets
-            deleted_worksheets = pre_worksheets - new_worksheets  # Identify deleted worksheets
-
-            self.logger.info(f"Previous worksheets: {pre_worksheets}")
-            self.logger.info(f"Latest worksheets: {new_worksheets}")
-            self.logger.info(f"Newly added worksheets: {new_added_worksheets}")
-            self.logger.info(f"Deleted worksheets: {deleted_worksheets}")
-
-            # Process each worksheet
-            self.logger.info(f"Writing output to: {output_file}")
-            with pd.ExcelWriter(output_file) as writer:
-                for sheet, df in new_df.items():
-                    processed_df = self.process_sheet(sheet, df, pre_df, new_added_worksheets, translator)
-                    if processed_df is not None and not processed_df.empty:
-                        processed_df.to_excel(writer, sheet_name=sheet, index=False)
-                        self.logger.info(f"{sheet} processing complete.")
-
-            self.logger.info(f"Processing completed. Output saved to {output_file}")
-
-        except Exception as e:
-            self.logger.error(f"Error processing files: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+        process_files(self.pre_file_path.get(), self.new_file_path.get(), self.output_file_path.get(),
+                      auth_key=self.deepl_key.get(), rem_list=rem_list, workers=self.workers.get(),
+                      target_langs=self.target_langs.get().split(','),
+                      progress=Progress(self.log_queue.put, interval=PROGRESS_INTERVAL), cancel=self.cancel_event)
 
     def start_processing(self):
         """Start processing in a separate thread to keep GUI responsive."""
@@ -317,10 +237,14 @@ class ExcelProcessorApp:
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state=tk.DISABLED)
 
-        # Disable the process button
-        for widget in self.root.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.config(state=tk.DISABLED)
+        # Reset the progress panel
+        self.progress_bar['value'] = 0
+        self.progress_text.set("Starting...")
+
+        # Disable the process button and allow cancelling
+        self.cancel_event = threading.Event()
+        self.process_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
 
         # Start processing thread
         processing_thread = threading.Thread(target=self.run_processing)
@@ -335,11 +259,17 @@ class ExcelProcessorApp:
             # Re-enable the process button
             self.root.after(0, self.enable_buttons)
 
+    def cancel_processing(self):
+        """Ask the running pipeline to stop; translations in flight finish and completed sheets are saved."""
+        self.cancel_event.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_text.set("Cancelling...")
+        logging.info("Cancelling: finishing requests in flight and saving completed sheets...")
+
     def enable_buttons(self):
-        """Re-enable all buttons in the GUI."""
-        for widget in self.root.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.config(state=tk.NORMAL)
+        """Re-enable the process button once a run has finished."""
+        self.process_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
 
 
 if __name__ == "__main__":
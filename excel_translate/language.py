@@ -0,0 +1,70 @@
+"""Offline source-language detection from the scripts and function words a text uses.
+
+Kana means Japanese, Hangul Korean, and Han characters without kana Chinese. Latin text only
+counts as English when it is plain ASCII and its English function words outnumber those of other
+Latin-script languages; short labels without any ("indoor", "Stuhl") are undecided unless the
+caller says which language its unmarked Latin text is in. Undecided text is left for DeepL.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+_KANA = re.compile(r'[\u3040-\u30ff]')
+_HANGUL = re.compile(r'[\u1100-\u11ff\u3130-\u318f\uac00-\ud7af]')
+_HAN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_WORD = re.compile(r'[A-Za-z]+')
+# Function words of one language only; words shared across languages ("a", "in", "die") are left out
+_ENGLISH_WORDS = frozenset(
+    'the and of to for with is are was be this that these those it its at by from or not your you we our '
+    'can will should must has have into onto over under without each all any one two use used only'.split())
+_OTHER_WORDS = frozenset(
+    'der das und ist nicht mit ein eine einem einer zu auf den dem von im sich auch '  # German
+    'le la les et est une des du pour avec dans sur pas au aux ce cette '  # French
+    'el los las y es una con para por del al lo '  # Spanish
+    'il gli di che per sono della delle '  # Italian
+    'het een van en voor niet op zijn'.split())  # Dutch
+# Every code detect_language() can return without a latin_lang hint
+DETECTABLE = ('EN', 'JA', 'KO', 'ZH')
+
+
+def _latin_language(text, latin_lang=None):
+    if any(char.isalpha() and not char.isascii() for char in text):
+        return None  # Accented letters: French, German, Spanish, ...
+    words = [word.lower() for word in _WORD.findall(text)]
+    if not words:
+        return None
+    english = sum(word in _ENGLISH_WORDS for word in words)
+    other = sum(word in _OTHER_WORDS for word in words)
+    if english > other:
+        return 'EN'
+    return base_language(latin_lang) if latin_lang and not (english or other) else None
+
+
+def detect_language(text, latin_lang=None):
+    """Return the DeepL source language code of text, or None when it cannot be told offline.
+
+    latin_lang, e.g. 'EN', is assumed for plain ASCII text with no function words to go by.
+    """
+    if _KANA.search(text):
+        return 'JA'  # Japanese mixes kana with Han characters
+    if _HANGUL.search(text):
+        return 'KO'
+    if _HAN.search(text):
+        return 'ZH'
+    return _latin_language(text, latin_lang)
+
+
+def base_language(lang):
+    """Strip the variant from a language code: EN-US -> EN."""
+    return lang.split('-')[0].upper()
+
+
+def language_mask(texts, lang, latin_lang=None):
+    """Return a boolean array marking the cells of a Series of strings detected as lang."""
+    lang = base_language(lang)
+    if lang not in DETECTABLE and lang != (latin_lang and base_language(latin_lang)):
+        return np.zeros(len(texts), dtype=bool)
+    codes, uniques = pd.factorize(texts)
+    matches = np.fromiter((detect_language(text, latin_lang) == lang for text in uniques), dtype=bool,
+                          count=len(uniques))
+    return matches[codes]
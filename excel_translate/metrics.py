@@ -0,0 +1,107 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+
+PROMETHEUS_PREFIX = "excel_translate"
+
+
+class Metrics:
+    """Thread-safe per-run stage timings and counters.
+
+    Stages record wall time and how often they ran; counters accumulate rows, characters, bytes,
+    cache hits and retries. Stages run concurrently, so their times can add up to more than the
+    total run time.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds, calls=1):
+        with self._lock:
+            total, count = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + seconds, count + calls)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one call of stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage, iterable):
+        """Yield from iterable, timing each step as one call of stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                # Time spent finishing the iterable still counts, but not as another call
+                self.add_time(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def merge(self, snapshot):
+        """Add in a snapshot from to_dict(), e.g. one shipped back from a worker process."""
+        for stage, values in snapshot['stages'].items():
+            self.add_time(stage, values['seconds'], values['calls'])
+        for name, value in snapshot['counters'].items():
+            self.count(name, value)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'stages': {stage: {'seconds': seconds, 'calls': calls}
+                           for stage, (seconds, calls) in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.to_dict()
+        lines = [f"# HELP {prefix}_stage_seconds_total Wall time spent in each pipeline stage.",
+                 f"# TYPE {prefix}_stage_seconds_total counter"]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {values["seconds"]:.6f}'
+                  for stage, values in snapshot['stages'].items()]
+        lines += [f"# HELP {prefix}_stage_calls_total Number of times each pipeline stage ran.",
+                  f"# TYPE {prefix}_stage_calls_total counter"]
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {values["calls"]}'
+                  for stage, values in snapshot['stages'].items()]
+        for name, value in snapshot['counters'].items():
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the metrics to path, as Prometheus text for .prom files and JSON otherwise."""
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        logging.info(f"Metrics written to {path}")
+
+    def log_summary(self):
+        snapshot = self.to_dict()
+        lines = ["Run metrics:", f"  {'stage':<24}{'calls':>8}{'seconds':>12}"]
+        lines += [f"  {stage:<24}{values['calls']:>8}{values['seconds']:>12.3f}"
+                  for stage, values in snapshot['stages'].items()]
+        lines += [f"  {'counter':<24}{'value':>20}"]
+        lines += [f"  {name:<24}{value:>20,}" for name, value in sorted(snapshot['counters'].items())]
+        logging.info("\n".join(lines))
+
+
+def timed(metrics, stage):
+    """metrics.timer(stage), or a no-op when no metrics are being collected."""
+    return metrics.timer(stage) if metrics is not None else nullcontext()
@@ -0,0 +1,532 @@
+import os
+import time
+import queue
+import logging
+import traceback
+import pandas as pd
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from excel_translate.backends import create_translator
+from excel_translate.translator import TranslationPlan, MultiTargetPlan, TranslationCancelled, DEFAULT_WORKERS
+from excel_translate.cache import TranslationCache, DEFAULT_CACHE_PATH
+from excel_translate.ratelimit import RateLimiter
+from excel_translate.fingerprint import RowIndex, row_fingerprints, load_sidecar, save_sidecar
+from excel_translate.excel_utils import iter_excel, preprocess_stream, file_digest, ExcelStreamWriter, STRING_DTYPE
+from excel_translate.checkpoint import Checkpoint, run_key
+from excel_translate.xlsx_scan import iter_xlsx_columns, list_sheets
+from excel_translate.metrics import Metrics, timed
+from excel_translate.budget import CharacterBudget, remaining_characters
+from excel_translate.snapshot import Snapshot, SnapshotWriter, snapshot_dir, write_sheet
+
+# Columns D:J and L of the source workbooks, in order
+SOURCE_COLUMNS = "D:J,L"
+EXPECTED_COLUMNS = ['Product', 'ASIN', 'Model_Requirements', 'Total_Video', 'Scene', 'Pets',
+                    'Requirements', 'Comments']
+TRANSLATE_COLUMNS = ['Product', 'Scene', 'Shooting_Requirements']
+DEFAULT_REMOVE_LIST = ['1001总表', '829主图', '1001主图', '汇总', '401总表', '409主图', '5332', '25549']
+# Rows per chunk when streaming the previous file into the row index
+INDEX_CHUNK_ROWS = 50_000
+DEFAULT_PROCESSES = 1
+DEFAULT_TARGET_LANGS = ('EN-US',)
+# With several target languages: one workbook per language, or one workbook with a column per language
+OUTPUT_MODES = ('workbooks', 'columns')
+
+
+def process_sheet(sheet, df, pre_index, row_hashes=None):
+    """Process a single worksheet, skipping old rows and preparing new data for translation.
+
+    Only the new rows are sliced out and transformed; df itself is never modified, so nothing
+    is copied up front. row_hashes are df's row fingerprints, if the caller already has them.
+    """
+    logging.info(f"Processing {sheet}...")
+
+    if len(df.columns) < len(EXPECTED_COLUMNS):
+        logging.warning(f"Skipping {sheet} due to missing columns.")
+        return None
+
+    if sheet in pre_index:
+        # Keep only rows whose content was not in the previous workbook
+        mask = pre_index.new_rows(sheet, df, row_hashes)
+        if not mask.any():
+            logging.info(f"No new rows to translate in {sheet}.")
+            return None
+        df = df[mask]
+    df = df.set_axis(EXPECTED_COLUMNS, axis=1)
+
+    # Fill missing values and concatenate fields. Blanks are filled after converting to the
+    # string dtype, which keeps them as <NA> rather than turning them into the text "nan".
+    df = df.assign(
+        Model_Requirements=df['Model_Requirements'].fillna('N/A'),
+        Scene=df['Scene'].astype(STRING_DTYPE).fillna('N/A'),
+        Shooting_Requirements=(df['Comments'].astype(STRING_DTYPE).fillna('') + '\r'
+                               + df['Requirements'].astype(STRING_DTYPE).fillna('')))
+
+    # Drop unnecessary columns
+    return df.drop(columns=['Requirements', 'Comments'])
+
+
+def transform_sheet(sheet, df, pre_hashes, metrics=None, row_hashes=None, snapshot_file=None):
+    """Transform stage: fingerprint the raw sheet and prepare its new rows for translation.
+
+    row_hashes are the sheet's fingerprints when they were loaded from a snapshot; with
+    snapshot_file, the raw sheet and its fingerprints are written there for later runs.
+    """
+    pre_index = RowIndex({sheet: pre_hashes} if pre_hashes is not None else {})
+    # The same fingerprints both find the new rows and go into the new file's row index
+    if row_hashes is None:
+        with timed(metrics, 'fingerprint'):
+            row_hashes = row_fingerprints(df).to_numpy()
+    if snapshot_file is not None:
+        try:
+            with timed(metrics, 'snapshot'):
+                write_sheet(snapshot_file, sheet, df, row_hashes)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not snapshot {sheet}: {e}")
+    with timed(metrics, 'process_sheet'):
+        processed_df = process_sheet(sheet, df, pre_index, row_hashes)
+    if metrics is not None:
+        metrics.count('rows_read', len(df))
+        metrics.count('rows_new', len(processed_df) if processed_df is not None else 0)
+    return processed_df, row_hashes
+
+
+class _RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _init_worker():
+    """Drop logging handlers inherited from the parent; records are shipped back with each result."""
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(logging.INFO)
+
+
+def create_transform_pool(processes):
+    """Process pool for the transform stage, which can be shared by several runs."""
+    return ProcessPoolExecutor(processes, initializer=_init_worker)
+
+
+def _read_and_transform(file_path, sheet, rem_list, pre_hashes, snapshot_file=None, digest=None):
+    """Read and transform one sheet inside a worker process, shipping its log records and metrics back."""
+    collector = _RecordCollector()
+    metrics = Metrics()
+    logging.getLogger().addHandler(collector)
+    try:
+        result = None, None
+        sheets = iter_xlsx_columns(file_path, SOURCE_COLUMNS, sheets={sheet}, digest=digest)
+        for _, df in metrics.timed_iter('read', preprocess_stream(sheets, rem_list)):
+            result = transform_sheet(sheet, df, pre_hashes, metrics, snapshot_file=snapshot_file)
+        return result, collector.records, metrics.to_dict()
+    finally:
+        logging.getLogger().removeHandler(collector)
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def _translate_stage(transformed, to_write, plan, new_index, in_worker, metrics=None, progress=None, cancel=None):
+    """Collect transformed sheets in input order and queue their new texts for translation."""
+    try:
+        while (item := transformed.get()) is not None:
+            sheet, future = item
+            if _cancelled(cancel):
+                future.cancel()  # Transforms not started yet are dropped
+                continue
+            if in_worker:
+                (processed_df, row_hashes), records, snapshot = future.result()
+                for record in records:
+                    if logging.getLogger().isEnabledFor(record.levelno):
+                        logging.getLogger().handle(record)
+                if metrics is not None:
+                    metrics.merge(snapshot)
+            else:
+                processed_df, row_hashes = future.result()
+            if row_hashes is not None:
+                new_index.add_hashes(sheet, row_hashes)
+            if processed_df is not None and not processed_df.empty:
+                with timed(metrics, 'plan'):
+                    plan.add(sheet, processed_df)
+                to_write.put((sheet, len(processed_df)))
+            elif progress is not None:
+                progress.sheet_done()
+    finally:
+        to_write.put(None)
+
+
+def _write_stage(to_write, plan, writer, progress=None):
+    """Write each sheet as soon as its translations are in, keeping the input sheet order.
+
+    After a cancellation, writing stops at the first sheet whose translations were cut short.
+    """
+    while (item := to_write.get()) is not None:
+        sheet, rows = item
+        try:
+            df = plan.result(sheet)
+        except TranslationCancelled:
+            logging.warning(f"Cancelled before {sheet} was fully translated; it and later sheets are not written.")
+            break
+        writer.write_sheet(sheet, df)
+        logging.info(f"{sheet} processing complete.")
+        if progress is not None:
+            progress.sheet_done(rows)
+
+
+def run_stages(new_file_loc, rem_list, pre_index, plan, writer, new_index, processes=DEFAULT_PROCESSES,
+               metrics=None, progress=None, cancel=None, transform_pool=None, snapshot=None, snapshot_writer=None,
+               digest=None):
+    """Move the sheets of new_file_loc through the read, transform, translate and write stages concurrently.
+
+    With one process the workbook is streamed on the calling thread and transformed on another.
+    With more, each sheet is read and transformed in a process pool, so only the small frame of
+    new rows crosses the process boundary. Translation dispatch and writing each get a thread, and
+    sheets are handed between stages in input order so the output sheet order is deterministic.
+
+    Setting the cancel event stops reading and planning new sheets; sheets already translated
+    are still written. Returns True when every sheet was read, i.e. reading was not cut short.
+
+    With more than one process, a transform_pool from create_transform_pool() is used instead of
+    starting a new one, and is left running afterwards. Passing new_file_loc's digest lets each
+    worker parse the workbook's shared strings and styles once rather than for every sheet.
+
+    Given a snapshot of the new file, its sheets are decoded from it on the calling thread instead
+    of being parsed. Otherwise each sheet is added to snapshot_writer, if given, as it is read.
+    """
+    in_worker = processes > 1 and snapshot is None
+    if in_worker and transform_pool is not None:
+        pool_context = nullcontext(transform_pool)
+    else:
+        transform_pool = create_transform_pool(processes) if in_worker else ThreadPoolExecutor(max_workers=1)
+        pool_context = transform_pool
+    transformed = queue.Queue()
+    to_write = queue.Queue()
+    read_all = False
+
+    with pool_context, ThreadPoolExecutor(max_workers=2) as stages:
+        translate = stages.submit(_translate_stage, transformed, to_write, plan, new_index, in_worker, metrics,
+                                  progress, cancel)
+        write = stages.submit(_write_stage, to_write, plan, writer, progress)
+        try:
+            if in_worker:
+                for sheet in list_sheets(new_file_loc):
+                    if _cancelled(cancel):
+                        break
+                    if sheet not in rem_list:
+                        transformed.put((sheet, transform_pool.submit(
+                            _read_and_transform, new_file_loc, sheet, rem_list, pre_index.sheets.get(sheet),
+                            _snapshot_file(snapshot_writer, sheet), digest)))
+                else:
+                    read_all = True
+            else:
+                if snapshot is not None:
+                    sheets = snapshot.iter_sheets()
+                else:
+                    sheets = ((sheet, df, None) for sheet, df
+                              in preprocess_stream(iter_excel(new_file_loc, SOURCE_COLUMNS), rem_list))
+                if metrics is not None:
+                    sheets = metrics.timed_iter('read', sheets)
+                for sheet, df, row_hashes in sheets:
+                    if _cancelled(cancel):
+                        break
+                    transformed.put((sheet, transform_pool.submit(
+                        transform_sheet, sheet, df, pre_index.sheets.get(sheet), metrics, row_hashes,
+                        _snapshot_file(snapshot_writer, sheet))))
+                else:
+                    read_all = True
+        finally:
+            transformed.put(None)
+        translate.result()
+        write.result()
+    return read_all
+
+
+def _snapshot_file(snapshot_writer, sheet):
+    return snapshot_writer.sheet_file(sheet) if snapshot_writer is not None else None
+
+
+class _DiscardWriter:
+    """Writer for dry runs, which go through every stage but produce no output file."""
+
+    sheets_written = 0
+
+    def write_sheet(self, sheet, df):
+        self.sheets_written += 1
+
+
+def language_output_path(output_file, target_lang):
+    """Output path of one language's workbook, e.g. output.xlsx -> output_DE.xlsx."""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_{target_lang}{ext or '.xlsx'}"
+
+
+def merge_language_columns(results, column_names):
+    """Combine a sheet's translations, replacing each translated column with one column per language."""
+    first = next(iter(results.values()))
+    data = {}
+    for column_name in first.columns:
+        if column_name in column_names:
+            for target_lang, df in results.items():
+                data[f"{column_name}_{target_lang}"] = df[column_name]
+        else:
+            data[column_name] = first[column_name]
+    return pd.DataFrame(data, index=first.index)
+
+
+class _LanguageWriter:
+    """Writes the {target_lang: df} results of a MultiTargetPlan in the chosen output mode."""
+
+    def __init__(self, writers, output_mode, column_names):
+        self.writers = writers
+        self.output_mode = output_mode
+        self.column_names = column_names
+
+    def write_sheet(self, sheet, results):
+        if self.output_mode == 'columns':
+            self.writers[None].write_sheet(sheet, merge_language_columns(results, self.column_names))
+        else:
+            for target_lang, df in results.items():
+                self.writers[target_lang].write_sheet(sheet, df)
+
+
+def open_writer(stack, output_file, target_langs, output_mode='workbooks', metrics=None):
+    """Open the output writer(s) on stack and return (writer, the ExcelStreamWriter of each output file)."""
+    if len(target_langs) == 1 or output_mode == 'columns':
+        writer = stack.enter_context(ExcelStreamWriter(output_file, metrics))
+        if len(target_langs) == 1:
+            return writer, [writer]
+        return _LanguageWriter({None: writer}, output_mode, TRANSLATE_COLUMNS), [writer]
+
+    writers = {target_lang: stack.enter_context(ExcelStreamWriter(language_output_path(output_file, target_lang),
+                                                                  metrics))
+               for target_lang in target_langs}
+    return _LanguageWriter(writers, output_mode, TRANSLATE_COLUMNS), list(writers.values())
+
+
+def index_settings(rem_list):
+    """Settings a saved row index depends on; a sidecar built with different ones is rebuilt."""
+    return {'columns': SOURCE_COLUMNS, 'remove': sorted(rem_list)}
+
+
+def load_previous_index(pre_file_loc, rem_list, digest=None, metrics=None):
+    """Build the row index of the previous file, reusing its sidecar when it still matches."""
+    settings = index_settings(rem_list)
+    with timed(metrics, 'load_sidecar'):
+        pre_index = load_sidecar(pre_file_loc, settings, digest)
+    if pre_index is not None:
+        logging.info(f"Loaded row index for previous file: {pre_file_loc}")
+        if metrics is not None:
+            metrics.count('sidecar_hits')
+        return pre_index
+
+    # Only the source columns are needed, so scan the sheet XML instead of loading it with openpyxl
+    logging.info(f"Reading previous file: {pre_file_loc}")
+    pre_index = RowIndex()
+    sheets = iter_xlsx_columns(pre_file_loc, SOURCE_COLUMNS, chunk_rows=INDEX_CHUNK_ROWS)
+    sheets = preprocess_stream(sheets, rem_list)
+    if metrics is not None:
+        sheets = metrics.timed_iter('read_previous', sheets)
+        metrics.count('bytes_read', os.path.getsize(pre_file_loc))
+    for sheet, df in sheets:
+        with timed(metrics, 'index_previous'):
+            pre_index.add(sheet, df)
+    save_sidecar(pre_file_loc, pre_index, settings, digest)
+    return pre_index
+
+
+def open_new_snapshot(snapshots, digest, rem_list, dry_run=False, metrics=None):
+    """Return (snapshot of the new file to read, or None; SnapshotWriter to fill, or None)."""
+    if snapshots is None:
+        return None, None
+    settings = index_settings(rem_list)
+    with timed(metrics, 'load_snapshot'):
+        snapshot = Snapshot.load(snapshots, digest, settings)
+    if snapshot is not None:
+        logging.info(f"Reading new file from snapshot: {snapshot.path}")
+        if metrics is not None:
+            metrics.count('snapshot_hits')
+        return snapshot, None
+    if dry_run:
+        return None, None
+    try:
+        os.makedirs(snapshots, exist_ok=True)
+        return None, SnapshotWriter(snapshots, digest, settings)
+    except OSError as e:
+        logging.warning(f"Could not create snapshot folder {snapshots}: {e}")
+        return None, None
+
+
+def process_files(pre_file_loc, new_file_loc, output_file, auth_key=None, rem_list=DEFAULT_REMOVE_LIST,
+                  workers=DEFAULT_WORKERS, cache_path=DEFAULT_CACHE_PATH, translator=None,
+                  processes=DEFAULT_PROCESSES, backend='deepl', metrics=None, metrics_path=None, dry_run=False,
+                  char_budget=None, check_usage=False, target_langs=DEFAULT_TARGET_LANGS, output_mode='workbooks',
+                  progress=None, cancel=None, cache=None, limiter=None, transform_pool=None, latin_lang=None):
+    """Run the full diff-and-translate pipeline. Returns True when every text was translated and written.
+
+    A run that was cancelled or left some texts untranslated returns False and keeps its checkpoint for a rerun.
+    output_mode is 'workbooks' (one per target language) or 'columns'. latin_lang is assumed for short plain-Latin
+    cells. A shared translator, cache, limiter or transform_pool is left open.
+    """
+    logging.info("Starting Excel processing...")
+
+    # Validate inputs
+    if not pre_file_loc or not new_file_loc:
+        logging.error("Please select both previous and new Excel files.")
+        return False
+
+    if not output_file and not dry_run:
+        logging.error("Please specify an output file location.")
+        return False
+
+    target_langs = list(dict.fromkeys(lang.strip().upper() for lang in target_langs if lang.strip()))
+    if not target_langs:
+        logging.error("Please specify at least one target language.")
+        return False
+
+    if output_mode not in OUTPUT_MODES:
+        logging.error(f"Unknown output mode: {output_mode}")
+        return False
+
+    if translator is None and backend == 'deepl' and not auth_key and (check_usage or not dry_run):
+        logging.error("Please enter a DeepL API key.")
+        return False
+
+    if metrics is None:
+        metrics = Metrics()
+    start = time.perf_counter()
+    try:
+        # Initialize the translator backend; a dry run only needs one to check usage
+        if translator is None and (check_usage or not dry_run):
+            translator = create_translator(backend, auth_key)
+
+        if check_usage:
+            remaining = remaining_characters(translator)
+            if remaining is not None:
+                char_budget = remaining if char_budget is None else min(char_budget, remaining)
+        budget = CharacterBudget(char_budget) if char_budget is not None else None
+
+        with metrics.timer('digest'):
+            pre_digest = file_digest(pre_file_loc)
+            new_digest = file_digest(new_file_loc)
+        snapshots = snapshot_dir(output_file) if output_file else None
+        pre_index = load_previous_index(pre_file_loc, rem_list, pre_digest, metrics)
+
+        # Resume translations from an interrupted run with the same inputs. A dry run leaves the
+        # journal alone, so texts it holds are counted as if they still had to be sent.
+        checkpoint = (Checkpoint(f"{output_file}.checkpoint", run_key(pre_digest, new_digest, rem_list))
+                      if not dry_run else None)
+
+        # Open the persistent translation memory, unless a shared one was passed in
+        own_cache = cache is None
+        if own_cache:
+            cache = TranslationCache(cache_path)
+        logging.info(f"Using translation cache: {cache.path}")
+        if limiter is None:
+            limiter = RateLimiter()
+        plans = {target_lang: TranslationPlan(TRANSLATE_COLUMNS, translator, target_lang, cache=cache, workers=workers,
+                                              limiter=limiter, checkpoint=checkpoint, metrics=metrics, budget=budget,
+                                              dry_run=dry_run, progress=progress, cancel=cancel, latin_lang=latin_lang)
+                 for target_lang in target_langs}
+        plan = plans[target_langs[0]] if len(plans) == 1 else MultiTargetPlan(plans)
+        new_snapshot, snapshot_writer = open_new_snapshot(snapshots, new_digest, rem_list, dry_run, metrics)
+
+        try:
+            # Stream the new file through the pipeline: each sheet is diffed, translated and written
+            # while later sheets are still being read
+            logging.info(f"Reading new file: {new_file_loc}")
+            new_index = RowIndex()
+            if new_snapshot is None:
+                metrics.count('bytes_read', os.path.getsize(new_file_loc))
+            if progress is not None:
+                progress.start(sum(1 for sheet in list_sheets(new_file_loc) if sheet not in rem_list))
+            with ExitStack() as stack:
+                if dry_run:
+                    writer, streams = _DiscardWriter(), []
+                else:
+                    writer, streams = open_writer(stack, output_file, target_langs, output_mode, metrics)
+                outputs = [stream.file_path for stream in streams]
+                if outputs:
+                    logging.info(f"Writing output to: {', '.join(outputs)}")
+                read_all = run_stages(new_file_loc, rem_list, pre_index, plan, writer, new_index, processes,
+                                      metrics, progress, cancel, transform_pool, new_snapshot, snapshot_writer,
+                                      new_digest)
+                if _cancelled(cancel):
+                    # Keep an earlier output rather than replacing it with a workbook of no sheets
+                    for stream in streams:
+                        stream.keep_empty = False
+            # The snapshot only holds the source workbook, so a run that failed or was cancelled
+            # after reading every sheet still leaves one for its rerun
+            if snapshot_writer is not None and read_all:
+                snapshot_writer.commit()
+                snapshot_writer = None
+            plan.close()
+            plan.log_summary()
+            if _cancelled(cancel):
+                saved = [stream.file_path for stream in streams if stream.sheets_written]
+                if saved:
+                    logging.warning(f"Processing cancelled. Completed sheets were saved to {', '.join(saved)}.")
+                else:
+                    logging.warning("Processing cancelled before any sheet was written; no output was saved.")
+                return False
+            if progress is not None:
+                progress.finish()
+            if dry_run:
+                plan.log_estimate()
+                if budget is not None and plan.estimated_characters > budget.limit:
+                    logging.warning(f"Estimated {plan.estimated_characters:,} characters exceed the budget of "
+                                    f"{budget.limit:,}.")
+
+            # Compare worksheet names
+            pre_worksheets = set(pre_index.keys())
+            new_worksheets = set(new_index.keys())
+            logging.info(f"Previous worksheets: {pre_worksheets}")
+            logging.info(f"Latest worksheets: {new_worksheets}")
+            logging.info(f"Newly added worksheets: {new_worksheets - pre_worksheets}")
+            logging.info(f"Deleted worksheets: {pre_worksheets - new_worksheets}")
+
+            if dry_run:
+                logging.info("Dry run completed. Nothing was translated or written.")
+                return True
+            if not plan.complete:
+                logging.error(f"Some texts were not translated and kept their source text in {', '.join(outputs)}. "
+                              "The checkpoint is kept, so a rerun only sends what is missing.")
+                return False
+            checkpoint.complete()
+        finally:
+            if snapshot_writer is not None:
+                snapshot_writer.discard()
+            plan.close()
+            if checkpoint is not None:
+                checkpoint.close()
+            cache.log_stats()
+            limiter.log_stats()
+            if budget is not None and not dry_run:
+                budget.log_stats()
+            if own_cache:
+                cache.close()
+
+        # Save the new file's row index so the next run can diff against it without re-reading
+        save_sidecar(new_file_loc, new_index, index_settings(rem_list), new_digest)
+
+        logging.info(f"Processing completed. Output saved to {', '.join(outputs)}")
+        return True
+
+    except FileNotFoundError as e:
+        logging.error(f"File {e.filename} not found.")
+        return False
+    except Exception as e:
+        logging.error(f"Error processing files: {str(e)}")
+        logging.error(traceback.format_exc())
+        return False
+    finally:
+        metrics.add_time('total', time.perf_counter() - start)
+        metrics.log_summary()
+        if metrics_path:
+            try:
+                metrics.export(metrics_path)
+            except OSError as e:
+                logging.error(f"Could not write metrics to {metrics_path}: {e}")
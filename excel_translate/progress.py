@@ -0,0 +1,116 @@
+import time
+import threading
+from collections import deque
+
+# Window over which the current characters/s rate is measured
+RATE_WINDOW = 10.0
+
+
+class Progress:
+    """Live run progress fed by the pipeline stages and reported through a callback.
+
+    Work is counted in characters: each unique text planned for translation adds its length, and
+    every text that is translated, served from cache or given up on advances by the same amount.
+    The rate is measured over the last RATE_WINDOW seconds and the ETA covers the work planned so
+    far; sheets not read yet are only reflected in the sheet count.
+
+    Reports are throttled to one per interval seconds, so feeding progress from hot paths stays
+    cheap; the callback runs on whichever pipeline thread triggered it and must not block.
+    """
+
+    def __init__(self, callback, interval=0.5):
+        self.callback = callback
+        self.interval = interval
+        self.sheets_total = 0
+        self.sheets_done = 0
+        self.rows_done = 0
+        self.characters_total = 0
+        self.characters_done = 0
+        self._started = time.monotonic()
+        self._reported = 0.0
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def start(self, sheets):
+        with self._lock:
+            self.sheets_total = sheets
+            self._started = time.monotonic()
+        self._report(force=True)
+
+    def add_work(self, characters):
+        with self._lock:
+            self.characters_total += characters
+        self._report()
+
+    def advance(self, characters):
+        with self._lock:
+            self.characters_done += characters
+        self._report()
+
+    def sheet_done(self, rows=0):
+        with self._lock:
+            self.sheets_done += 1
+            self.rows_done += rows
+        self._report(force=True)
+
+    def finish(self):
+        """Mark every sheet done, including empty ones no stage reported, and report."""
+        with self._lock:
+            self.sheets_done = self.sheets_total
+        self._report(force=True)
+
+    def _rate(self, now):
+        """Characters per second over the last RATE_WINDOW seconds."""
+        self._samples.append((now, self.characters_done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+        since, done = self._samples[0]
+        return (self.characters_done - done) / (now - since) if now > since else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot(time.monotonic())
+
+    def _snapshot(self, now):
+        rate = self._rate(now)
+        remaining = max(0, self.characters_total - self.characters_done)
+        return {
+            'sheets_done': self.sheets_done,
+            'sheets_total': self.sheets_total,
+            'rows_done': self.rows_done,
+            'characters_done': self.characters_done,
+            'characters_total': self.characters_total,
+            'characters_per_second': rate,
+            'eta_seconds': remaining / rate if rate > 0 else None,
+            'fraction': self._fraction(),
+            'elapsed_seconds': now - self._started,
+        }
+
+    def _fraction(self):
+        """Share of the run done by characters, held below the share of sheets not yet written."""
+        if not self.sheets_total:
+            return 0.0
+        by_sheets = self.sheets_done / self.sheets_total
+        if not self.characters_total:
+            return by_sheets
+        by_characters = self.characters_done / self.characters_total
+        return min(by_characters, (self.sheets_done + 1) / self.sheets_total) if by_sheets < 1 else 1.0
+
+    def _report(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._reported < self.interval:
+                return
+            self._reported = now
+            snapshot = self._snapshot(now)
+        self.callback(snapshot)
+
+
+def format_progress(snapshot):
+    """One-line summary of a progress snapshot for logs and status panels."""
+    eta = snapshot['eta_seconds']
+    eta = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else '--:--:--'
+    return (f"Sheets {snapshot['sheets_done']}/{snapshot['sheets_total']}  |  "
+            f"Rows {snapshot['rows_done']:,}  |  "
+            f"Characters {snapshot['characters_done']:,}/{snapshot['characters_total']:,}  |  "
+            f"{snapshot['characters_per_second']:,.0f} chars/s  |  ETA {eta}")
@@ -0,0 +1,79 @@
+import random
+import threading
+import time
+import logging
+
+import deepl
+
+DEFAULT_RATE = 5.0
+MAX_BACKOFF = 60.0
+
+
+def is_throttled(error):
+    """Return True for errors that mean the API wants us to slow down (429, 5xx, dropped connections)."""
+    if isinstance(error, (deepl.TooManyRequestsException, deepl.ConnectionException)):
+        return True
+    status = getattr(error, 'http_status_code', None)
+    return status is not None and status >= 500
+
+
+def is_retryable(error):
+    """Return False for errors that will fail again unchanged, such as 400 or 413 responses."""
+    return is_throttled(error) or getattr(error, 'should_retry', None) is not False
+
+
+def backoff_delay(attempt, base=1.0, cap=MAX_BACKOFF):
+    """Exponential backoff with full jitter for the given 1-based attempt number."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RateLimiter:
+    """Token bucket shared by all translation calls, tuned AIMD-style from API feedback.
+
+    Every success raises the request rate additively; every throttling response halves it.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=0.5, max_rate=50.0, increase=0.1, decrease=0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.retries = 0
+        self.throttled = 0
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.throttled += 1
+
+    def on_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def log_stats(self):
+        logging.info(f"Rate limiter: {self.rate:.2f} requests/s, {self.retries} retries, "
+                     f"{self.throttled} throttling responses.")
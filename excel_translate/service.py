@@ -0,0 +1,348 @@
+"""Long-running local HTTP service that runs text batches and workbooks through the shared pipeline.
+
+Internal tools post jobs instead of each building their own translator and cache:
+
+    POST   /translate         JSON {"texts": [...], "target_lang": "EN-US", "formality": null}
+    POST   /workbooks         multipart/form-data with "previous" and "new" .xlsx files;
+                              query parameters target_lang (comma-separated) and remove
+    GET    /jobs/<id>         status, progress and metrics; the translations once a text job is done
+    GET    /jobs/<id>/output  the translated workbook of a finished workbook job
+    DELETE /jobs/<id>         cancel a job between chunks and sheets
+    GET    /health
+
+Posting with ?wait=1 answers with the finished job instead of 202 and its status URL. All jobs
+share one translator, translation memory and rate limiter, and the translator is wrapped so that
+identical texts requested by concurrent jobs go upstream in a single call. The server only uses
+asyncio from the standard library and binds to localhost by default.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import email.policy
+import urllib.parse
+from http import HTTPStatus
+from email.parser import BytesParser
+from concurrent.futures import ThreadPoolExecutor
+from excel_translate.backends import BACKENDS, create_translator, CoalescingTranslator
+from excel_translate.cache import TranslationCache, DEFAULT_CACHE_PATH
+from excel_translate.ratelimit import RateLimiter
+from excel_translate.metrics import Metrics
+from excel_translate.progress import Progress
+from excel_translate.textfilter import is_translatable
+from excel_translate.translator import translate_texts, TranslationCancelled, DEFAULT_WORKERS
+from excel_translate.pipeline import process_files, DEFAULT_REMOVE_LIST, DEFAULT_TARGET_LANGS
+from excel_translate.cli import configure_logging, remove_list, AUTH_KEY_ENV, EXIT_OK, EXIT_USAGE
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Jobs running at once; each still spreads its requests over the translation workers
+DEFAULT_MAX_JOBS = 4
+MAX_BODY_BYTES = 200 * 1024 * 1024
+# Finished jobs, and their files, are dropped this long after they end
+JOB_RETENTION_SECONDS = 3600
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """One text batch or workbook pair, run on the service's job pool."""
+
+    def __init__(self, kind, work_dir):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.dir = os.path.join(work_dir, self.id)
+        self.status = 'queued'
+        self.error = None
+        self.result = None
+        self.output = None
+        self.progress = None
+        self.metrics = Metrics()
+        self.cancel = threading.Event()
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+
+    def update_progress(self, snapshot):
+        self.progress = snapshot
+
+    def to_dict(self):
+        status = {'id': self.id, 'kind': self.kind, 'status': self.status, 'created': self.created,
+                  'finished': self.finished, 'progress': self.progress,
+                  'metrics': self.metrics.to_dict()['counters']}
+        if self.error:
+            status['error'] = self.error
+        if self.result is not None:
+            status['translations'] = self.result
+        if self.output is not None:
+            status['output_url'] = f"/jobs/{self.id}/output"
+        return status
+
+
+class TranslationService:
+    """Job registry and HTTP handler around one shared translator, cache and rate limiter."""
+
+    def __init__(self, translator, cache, work_dir, workers=DEFAULT_WORKERS, max_jobs=DEFAULT_MAX_JOBS,
+                 rem_list=DEFAULT_REMOVE_LIST, limiter=None):
+        self.translator = CoalescingTranslator(translator)
+        self.cache = cache
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.work_dir = work_dir
+        self.workers = workers
+        self.rem_list = rem_list
+        self.jobs = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+
+    # Jobs
+
+    def submit(self, job, run, *args):
+        self._purge()
+        self.jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job, run, *args)
+        logging.info(f"Job {job.id} ({job.kind}) queued.")
+        return job
+
+    def _run(self, job, run, *args):
+        job.status = 'running'
+        try:
+            ok = run(job, *args)
+            job.status = 'done' if ok else ('cancelled' if job.cancel.is_set() else 'failed')
+            if not ok and job.status == 'failed':
+                job.error = "Processing failed; see the service log."
+        except TranslationCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logging.exception(f"Job {job.id} failed")
+            job.status, job.error = 'failed', str(e)
+        job.finished = time.time()
+        logging.info(f"Job {job.id} {job.status}.")
+
+    def _translate_job(self, job, texts, target_lang, formality):
+        unique = [text for text in dict.fromkeys(texts) if is_translatable(text)]
+        progress = Progress(job.update_progress)
+        progress.start(1)
+        progress.add_work(sum(len(text) for text in unique))
+        translated = translate_texts(unique, self.translator, target_lang, cache=self.cache, formality=formality,
+                                     workers=self.workers, limiter=self.limiter, metrics=job.metrics,
+                                     progress=progress, cancel=job.cancel)
+        found = dict(zip(unique, translated))
+        job.result = [found.get(text, text) for text in texts]
+        progress.finish()
+        return True
+
+    def _workbook_job(self, job, previous, new, target_langs, rem_list):
+        output = os.path.join(job.dir, "output.xlsx")
+        ok = process_files(previous, new, output, rem_list=rem_list, workers=self.workers, translator=self.translator,
+                           metrics=job.metrics, target_langs=target_langs, output_mode='columns',
+                           progress=Progress(job.update_progress), cancel=job.cancel, cache=self.cache,
+                           limiter=self.limiter)
+        if ok:
+            job.output = output
+        return ok
+
+    def _purge(self):
+        """Forget jobs that finished more than JOB_RETENTION_SECONDS ago and delete their files."""
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.finished is not None and job.finished < cutoff:
+                del self.jobs[job_id]
+                shutil.rmtree(job.dir, ignore_errors=True)
+
+    def close(self):
+        for job in self.jobs.values():
+            job.cancel.set()
+        self._pool.shutdown(wait=True)
+        self.limiter.log_stats()
+        logging.info(f"Texts coalesced with concurrent requests: {self.translator.coalesced}")
+
+    # HTTP
+
+    async def handle(self, method, path, query, headers, body):
+        """Route one request. Returns (status, payload) where payload is a dict or (bytes, content type)."""
+        parts = [part for part in path.split('/') if part]
+        wait = query.get('wait', ['0'])[0].lower() in ('1', 'true', 'yes')
+        if parts == ['health'] and method == 'GET':
+            return HTTPStatus.OK, {'status': 'ok', 'jobs': len(self.jobs)}
+        if parts == ['translate'] and method == 'POST':
+            return await self._accepted(self._create_text_job(body), wait)
+        if parts == ['workbooks'] and method == 'POST':
+            return await self._accepted(self._create_workbook_job(headers, query, body), wait)
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No job {parts[1]}")
+            if len(parts) == 3 and parts[2] == 'output' and method == 'GET':
+                if job.output is None:
+                    raise HTTPError(HTTPStatus.CONFLICT, f"Job {job.id} has no output (status: {job.status})")
+                with open(job.output, 'rb') as f:
+                    return HTTPStatus.OK, (f.read(), XLSX_CONTENT_TYPE)
+            if len(parts) == 2 and method == 'GET':
+                return HTTPStatus.OK, job.to_dict()
+            if len(parts) == 2 and method == 'DELETE':
+                job.cancel.set()
+                return HTTPStatus.ACCEPTED, job.to_dict()
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def _accepted(self, job, wait):
+        if wait:
+            await asyncio.wrap_future(job.future)
+            return HTTPStatus.OK, job.to_dict()
+        return HTTPStatus.ACCEPTED, {**job.to_dict(), 'status_url': f"/jobs/{job.id}"}
+
+    def _create_text_job(self, body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        texts = request.get('texts') if isinstance(request, dict) else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected {\"texts\": [strings]}")
+        target_lang = str(request.get('target_lang') or DEFAULT_TARGET_LANGS[0]).strip().upper()
+        return self.submit(Job('texts', self.work_dir), self._translate_job, texts, target_lang,
+                           request.get('formality'))
+
+    def _create_workbook_job(self, headers, query, body):
+        files = _parse_form(headers.get('content-type', ''), body)
+        if not files.get('previous') or not files.get('new'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Upload both a 'previous' and a 'new' workbook")
+        target_langs = [lang for lang in query.get('target_lang', [','.join(DEFAULT_TARGET_LANGS)])[0].split(',')
+                        if lang.strip()]
+        rem_list = ([item.strip() for item in query['remove'][0].split(',') if item.strip()]
+                    if 'remove' in query else self.rem_list)
+        job = Job('workbook', self.work_dir)
+        os.makedirs(job.dir, exist_ok=True)
+        paths = []
+        for name in ('previous', 'new'):
+            path = os.path.join(job.dir, f"{name}.xlsx")
+            with open(path, 'wb') as f:
+                f.write(files[name])
+            paths.append(path)
+        return self.submit(job, self._workbook_job, *paths, target_langs, rem_list)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, payload = await self._dispatch(reader)
+            if isinstance(payload, dict):
+                payload = (json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json")
+            content, content_type = payload
+            writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                         f"Content-Type: {content_type}\r\n"
+                         f"Content-Length: {len(content)}\r\n"
+                         "Connection: close\r\n\r\n".encode('latin-1') + content)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        try:
+            method, path, query, headers, body = await _read_request(reader)
+            return await self.handle(method, path, query, headers, body)
+        except HTTPError as e:
+            return HTTPStatus(e.status), {'error': str(e)}
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            logging.exception("Request failed")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+
+async def _read_request(reader):
+    """Parse one HTTP/1.1 request: (method, path, query, lower-cased headers, body)."""
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    method, target, _ = request_line
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body over {MAX_BODY_BYTES:,} bytes")
+    body = await reader.readexactly(length) if length else b''
+    url = urllib.parse.urlsplit(target)
+    return method.upper(), url.path, urllib.parse.parse_qs(url.query), headers, body
+
+
+def _parse_form(content_type, body):
+    """Return the fields of a multipart/form-data body as {name: bytes}."""
+    if not content_type.lower().startswith('multipart/form-data'):
+        raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Expected a multipart/form-data upload")
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body)
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logging.info(f"Translation service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m excel_translate.service",
+        description="Run a local HTTP service translating text batches and workbooks with one shared translator.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_MAX_JOBS,
+                        help="jobs run at once (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="concurrent translation requests per job (default: %(default)s)")
+    parser.add_argument("--remove", default=",".join(DEFAULT_REMOVE_LIST),
+                        help="default comma-separated columns/sheets to remove (default: %(default)s)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="translation memory location (default: %(default)s)")
+    parser.add_argument("--backend", choices=BACKENDS, default="deepl",
+                        help="translation backend; 'fake' runs offline without an API key (default: %(default)s)")
+    parser.add_argument("--work-dir", help="where uploads and outputs are kept (default: a temporary folder)")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings and errors")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args)
+
+    auth_key = os.environ.get(AUTH_KEY_ENV)
+    if args.backend == "deepl" and not auth_key:
+        logging.error(f"Set the {AUTH_KEY_ENV} environment variable to your DeepL API key.")
+        return EXIT_USAGE
+    if args.jobs < 1 or args.workers < 1:
+        logging.error("--jobs and --workers must be at least 1.")
+        return EXIT_USAGE
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="excel_translate_")
+    os.makedirs(work_dir, exist_ok=True)
+    cache = TranslationCache(args.cache)
+    service = TranslationService(create_translator(args.backend, auth_key), cache, work_dir, workers=args.workers,
+                                 max_jobs=args.jobs, rem_list=remove_list(args))
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        logging.info("Shutting down...")
+    finally:
+        service.close()
+        cache.log_stats()
+        cache.close()
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
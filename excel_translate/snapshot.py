@@ -0,0 +1,243 @@
+"""Columnar snapshots of processed workbooks, so reruns skip parsing the xlsx.
+
+When a run reads a workbook, each sheet's source columns and row fingerprints are also written to
+a snapshot folder next to the output, named after the workbook's SHA-256. A later run handed a
+new workbook with the same content loads the snapshot instead: its cells are decoded from flat
+buffers rather than parsed from sheet XML, and its fingerprints are read straight from the
+memory-mapped file. A previous workbook only needs its fingerprints, which the row index sidecar
+saved next to it (fingerprint.py) already holds, so snapshots are not consulted for it.
+
+Each sheet is one uint8 .npy file holding its column buffers back to back, with a JSON layout
+beside it, in the spirit of an Arrow IPC file. Numeric and datetime columns are stored as their
+raw arrays; other columns as one UTF-8 buffer with offsets and a type tag per cell, so mixed
+columns come back with the same Python values. Each sheet file is written by whichever thread
+or process read the sheet, and the snapshot only becomes visible once every sheet is in place.
+"""
+import os
+import json
+import math
+import time
+import uuid
+import shutil
+import logging
+import datetime
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_DIR = '.snapshots'
+SNAPSHOT_FORMAT = 1
+# Snapshots kept per folder; the newest is usually the next run's previous file
+SNAPSHOT_KEEP = 5
+# Partial snapshots left behind by runs that crashed are removed after this long
+STALE_PARTIAL_SECONDS = 24 * 3600
+_META_FILE = 'snapshot.json'
+_ALIGN = 8
+
+# Cell types of text/object columns, by tag (0 is a blank cell): (types, encode, decode)
+_CELL_TYPES = [
+    (str, lambda v: v, lambda s: s),
+    ((bool, np.bool_), lambda v: '1' if v else '', lambda s: s == '1'),
+    ((int, np.integer), lambda v: str(int(v)), int),
+    (float, repr, float),
+    (datetime.datetime, lambda v: v.isoformat(), datetime.datetime.fromisoformat),
+    (datetime.date, lambda v: v.isoformat(), datetime.date.fromisoformat),
+    (datetime.time, lambda v: v.isoformat(), datetime.time.fromisoformat),
+    (datetime.timedelta, lambda v: str(v // datetime.timedelta(microseconds=1)),
+     lambda s: datetime.timedelta(microseconds=int(s))),
+]
+
+
+def snapshot_dir(output_file):
+    """Folder holding the snapshots of workbooks processed into output_file's folder."""
+    return os.path.join(os.path.dirname(os.path.abspath(output_file)), SNAPSHOT_DIR)
+
+
+def _is_blank(value):
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and math.isnan(value))
+
+
+def _encode_cell(value):
+    for tag, (types, encode, _) in enumerate(_CELL_TYPES, 1):
+        if isinstance(value, types):
+            return tag, encode(value)
+    raise TypeError(f"cannot snapshot a cell of type {type(value).__name__}")
+
+
+def _encode_values(values):
+    """Return (tags, offsets, data) arrays for a sequence of cell values."""
+    tags = np.zeros(len(values), dtype=np.int8)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    pieces = []
+    size = 0
+    for i, value in enumerate(values):
+        if not _is_blank(value):
+            tags[i], text = _encode_cell(value)
+            piece = text.encode('utf-8')
+            pieces.append(piece)
+            size += len(piece)
+        offsets[i + 1] = size
+    return tags, offsets, np.frombuffer(b''.join(pieces), dtype=np.uint8)
+
+
+def _decode_values(tags, offsets, data):
+    raw = data.tobytes()
+    decoders = [None] + [decode for _, _, decode in _CELL_TYPES]
+    offsets = offsets.tolist()
+    return [decoders[tag](raw[offsets[i]:offsets[i + 1]].decode('utf-8')) if tag else None
+            for i, tag in enumerate(tags.tolist())]
+
+
+def write_sheet(path, sheet, df, row_hashes):
+    """Write one sheet's columns and row fingerprints to path (.npy) and its layout to path.json."""
+    buffers = []
+    offset = 0
+
+    def add(array):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        entry = [offset, array.dtype.str, len(array)]
+        raw = array.view(np.uint8).reshape(-1) if array.size else np.empty(0, dtype=np.uint8)
+        padding = -len(raw) % _ALIGN
+        buffers.append(raw)
+        if padding:
+            buffers.append(np.zeros(padding, dtype=np.uint8))
+        offset += len(raw) + padding
+        return entry
+
+    columns = []
+    for name, col in df.items():
+        if isinstance(col.dtype, np.dtype) and col.dtype.kind in 'biufmM':
+            columns.append({'name': name, 'dtype': col.dtype.str, 'data': add(col.to_numpy())})
+        else:
+            tags, offsets, data = _encode_values(col.to_numpy(dtype=object))
+            columns.append({'name': name, 'dtype': str(col.dtype), 'tags': add(tags), 'offsets': add(offsets),
+                            'data': add(data)})
+    layout = {'sheet': sheet, 'rows': len(df), 'columns': columns,
+              'hashes': add(np.asarray(row_hashes, dtype=np.uint64))}
+
+    # Trailing padding keeps even an empty sheet's file mappable
+    np.save(path, np.concatenate(buffers + [np.zeros(_ALIGN, dtype=np.uint8)]))
+    with open(f"{path}.json", 'w', encoding='utf-8') as f:
+        json.dump(layout, f, ensure_ascii=False)
+
+
+def _view(blob, entry):
+    offset, dtype, count = entry
+    dtype = np.dtype(dtype)
+    return blob[offset:offset + count * dtype.itemsize].view(dtype)
+
+
+def read_sheet(path):
+    """Return (df, row_hashes) from a sheet file.
+
+    The file is memory-mapped: the fingerprints and numeric columns are views of it, and only
+    text columns are decoded into Python objects.
+    """
+    with open(f"{path}.json", encoding='utf-8') as f:
+        layout = json.load(f)
+    blob = np.load(path, mmap_mode='r')
+    hashes = _view(blob, layout['hashes'])
+
+    series = {}
+    for position, column in enumerate(layout['columns']):
+        if 'tags' in column:
+            values = _decode_values(_view(blob, column['tags']), _view(blob, column['offsets']),
+                                    _view(blob, column['data']))
+            col = pd.Series(values, dtype=object)
+            series[position] = col if column['dtype'] == 'object' else col.astype(column['dtype'])
+        else:
+            series[position] = pd.Series(_view(blob, column['data']))
+    df = pd.DataFrame(series, index=pd.RangeIndex(layout['rows']))
+    df.columns = [column['name'] for column in layout['columns']]
+    return df, hashes
+
+
+class Snapshot:
+    """A published snapshot of one workbook."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+
+    @classmethod
+    def load(cls, folder, digest, settings=None):
+        """Return the snapshot of the workbook with this SHA-256 in folder, if one matches settings."""
+        path = os.path.join(folder, digest)
+        meta_path = os.path.join(path, _META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('format') != SNAPSHOT_FORMAT or meta.get('sha256') != digest
+                    or meta.get('settings') != settings):
+                return None
+            os.utime(path)  # Keeps snapshots in use from being pruned
+            return cls(path, meta)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring snapshot {path}: {e}")
+            return None
+
+    def _files(self):
+        return [(sheet, os.path.join(self.path, name)) for sheet, name in self.meta['sheets']]
+
+    def iter_sheets(self):
+        """Yield (sheet, df, row_hashes) in the workbook's order."""
+        for sheet, path in self._files():
+            df, hashes = read_sheet(path)
+            yield sheet, df, hashes
+
+
+class SnapshotWriter:
+    """Collects the sheet files of a workbook's snapshot and publishes them together."""
+
+    def __init__(self, folder, digest, settings=None):
+        self.folder = folder
+        self.digest = digest
+        self.settings = settings
+        self.sheets = []
+        self._staging = os.path.join(folder, f"{digest}.partial-{uuid.uuid4().hex[:8]}")
+        os.makedirs(self._staging)
+
+    def sheet_file(self, sheet):
+        """Path the given sheet should be written to with write_sheet()."""
+        name = f"{len(self.sheets)}.npy"
+        self.sheets.append((sheet, name))
+        return os.path.join(self._staging, name)
+
+    def commit(self):
+        """Publish the snapshot if every sheet was written, then prune old snapshots."""
+        missing = [sheet for sheet, name in self.sheets
+                   if not os.path.exists(os.path.join(self._staging, f"{name}.json"))]
+        if missing:
+            logging.warning(f"Snapshot not saved; sheets missing: {', '.join(missing)}")
+            return self.discard()
+        meta = {'format': SNAPSHOT_FORMAT, 'sha256': self.digest, 'settings': self.settings, 'sheets': self.sheets}
+        try:
+            with open(os.path.join(self._staging, _META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            target = os.path.join(self.folder, self.digest)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(self._staging, target)
+            logging.info(f"Saved workbook snapshot: {target}")
+        except OSError as e:
+            logging.warning(f"Could not save snapshot: {e}")
+            return self.discard()
+        prune_snapshots(self.folder)
+
+    def discard(self):
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+
+def prune_snapshots(folder, keep=SNAPSHOT_KEEP):
+    """Delete all but the keep most recently used snapshots in folder, and day-old partial ones."""
+    try:
+        entries = [entry for entry in os.scandir(folder) if entry.is_dir()]
+    except OSError:
+        return
+    stale = time.time() - STALE_PARTIAL_SECONDS
+    partial = [entry for entry in entries if '.partial-' in entry.name]
+    entries = sorted((entry for entry in entries if '.partial-' not in entry.name),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:] + [entry for entry in partial if entry.stat().st_mtime < stale]:
+        shutil.rmtree(entry.path, ignore_errors=True)
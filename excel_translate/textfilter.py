@@ -0,0 +1,28 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Cells that come back from translation unchanged, so sending them only costs latency and quota
+UNTRANSLATABLE = re.compile(r"""
+    \s*(?:
+        [\W\d_]*                        # no letters at all: blanks, lone \r, numbers, dates, dashes
+      | n/?a | none | null | nan        # filler values, including process_sheet's own "N/A"
+      | B0[0-9A-Z]{8}                   # ASIN
+      | (?:https?://|www\.)\S+          # URL
+      | [\w.+-]+@[\w-]+(?:\.[\w-]+)+    # e-mail address
+    )\s*
+""", re.VERBOSE | re.IGNORECASE)
+
+
+def is_translatable(text):
+    return UNTRANSLATABLE.fullmatch(text) is None
+
+
+def translatable_mask(texts):
+    """Return a boolean array marking the cells of a Series of strings worth translating.
+
+    Each distinct value is matched once, which keeps columns with many repeats cheap.
+    """
+    codes, uniques = pd.factorize(texts)
+    keep = np.fromiter((is_translatable(text) for text in uniques), dtype=bool, count=len(uniques))
+    return keep[codes]
@@ -1,21 +1,491 @@
+import time
+import json
+import threading
 import deepl
 import logging
+import pandas as pd
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from excel_translate.ratelimit import backoff_delay, is_throttled, is_retryable
+from excel_translate.metrics import timed
+from excel_translate.excel_utils import STRING_DTYPE
+from excel_translate.textfilter import translatable_mask
+from excel_translate.language import detect_language, base_language, language_mask
 
-def translate_column(df, column_name, translator, target_lang='EN-US'):
+# DeepL accepts at most 50 texts and 128 KiB of request body per call; the rest of the limit is
+# left for the other request fields
+MAX_TEXTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 120 * 1024
+MAX_CHUNK_ATTEMPTS = 6
+DEFAULT_WORKERS = 4
+
+
+class TranslationCancelled(Exception):
+    """Raised when translation stops because the run was cancelled."""
+
+
+def chunk_texts(texts, max_count=MAX_TEXTS_PER_REQUEST, max_bytes=MAX_REQUEST_BYTES):
+    """Split texts into chunks bounded by both item count and total request body size.
+
+    The client sends texts as ASCII-escaped JSON, so a CJK character takes 6 bytes on the wire
+    rather than its 3 UTF-8 bytes; each text is measured as encoded, plus its separator.
+    """
+    chunk = []
+    chunk_bytes = 0
+    for text in texts:
+        size = len(json.dumps(text)) + 1
+        if chunk and (len(chunk) >= max_count or chunk_bytes + size > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(text)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def _translate_chunk(chunk, translator, target_lang, formality=None, limiter=None, attempts=MAX_CHUNK_ATTEMPTS,
+                     metrics=None, source_lang=None, cancel=None):
+    """Translate one chunk, retrying it on its own with jittered backoff before giving up.
+
+    Errors that would fail again unchanged (a 400 or 413 response) are raised without retrying.
+    Setting the cancel event, if given, ends the backoff wait and abandons the chunk.
+    """
+    kwargs = {'formality': formality} if formality else {}
+    if source_lang:
+        kwargs['source_lang'] = source_lang
+    for attempt in range(1, attempts + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            with timed(metrics, 'api_request'):
+                translations = translator.translate_text(chunk, target_lang=target_lang, **kwargs)
+        except (deepl.AuthorizationException, deepl.QuotaExceededException):
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if limiter is not None:
+                if is_throttled(e):
+                    limiter.on_throttle()
+                limiter.on_retry()
+            if metrics is not None:
+                metrics.count('retries')
+            if attempt == attempts:
+                raise
+            logging.warning(f"Chunk of {len(chunk)} texts failed (attempt {attempt}/{attempts}): {e}")
+            if cancel is None:
+                time.sleep(backoff_delay(attempt))
+            elif cancel.wait(backoff_delay(attempt)):
+                raise TranslationCancelled()
+            continue
+        if limiter is not None:
+            limiter.on_success()
+        if metrics is not None:
+            metrics.count('requests')
+            metrics.count('characters_sent', sum(len(text) for text in chunk))
+        return [t.text for t in translations]
+
+
+# Result of a chunk skipped because the run was cancelled
+CANCELLED = object()
+
+
+def _translate_chunk_safely(chunk, translator, target_lang, formality=None, limiter=None, metrics=None,
+                            budget=None, source_lang=None, cancel=None):
+    """Translate one chunk, returning None instead of raising for recoverable failures.
+
+    A chunk the character budget has no room for is not sent and comes back as an empty dict.
+    Once the cancel event is set, chunks not yet started are not sent and come back as CANCELLED.
+    """
+    if cancel is not None and cancel.is_set():
+        return CANCELLED
+    if budget is not None and not budget.reserve(sum(len(text) for text in chunk), len(chunk)):
+        if metrics is not None:
+            metrics.count('texts_over_budget', len(chunk))
+        return {}
+    try:
+        return dict(zip(chunk, _translate_chunk(chunk, translator, target_lang, formality, limiter,
+                                                metrics=metrics, source_lang=source_lang, cancel=cancel)))
+    except (deepl.AuthorizationException, deepl.QuotaExceededException):
+        raise
+    except TranslationCancelled:
+        return CANCELLED
+    except Exception as e:
+        logging.error(f"Error translating chunk of {len(chunk)} texts, keeping source text: {e}")
+        return None
+
+
+def lookup_translations(texts, target_lang, cache=None, checkpoint=None, formality=None, metrics=None):
+    """Return the translations of texts already in the run checkpoint or the translation cache."""
+    found = {}
+    for name, store in (('checkpoint_hits', checkpoint), ('cache_hits', cache)):
+        if store is not None:
+            hits = store.get_many(set(texts).difference(found), target_lang, formality=formality)
+            found.update(hits)
+            if metrics is not None:
+                metrics.count(name, len(hits))
+    return found
+
+
+def translate_texts(texts, translator, target_lang='EN-US', cache=None, formality=None, workers=1, limiter=None,
+                    checkpoint=None, metrics=None, budget=None, progress=None, cancel=None, executor=None,
+                    failed_texts=None, latin_lang=None):
+    """Translate a list of texts, serving repeats from the cache and sending the rest grouped by detected language.
+
+    Chunks that fail for good, or that the budget has no room for, keep their source text; failed ones are also
+    added to failed_texts, if given. executor, a shared ThreadPoolExecutor, replaces the `workers` threads. Raises
+    TranslationCancelled once cancel is set and the chunks in flight are done. latin_lang is assumed for short
+    plain-Latin texts.
+    """
+    found = lookup_translations(texts, target_lang, cache, checkpoint, formality, metrics)
+    groups = {}
+    for text in dict.fromkeys(text for text in texts if text not in found):
+        groups.setdefault(detect_language(text, latin_lang), []).append(text)
+    for text in groups.pop(base_language(target_lang), []):
+        found[text] = text
+    misses = [text for group in groups.values() for text in group]
+    if progress is not None:
+        progress.advance(sum(len(text) for text in set(texts) if text in found))
+    chunks = [(source_lang, chunk) for source_lang, group in groups.items() for chunk in chunk_texts(group)]
+
+    failed = 0
+    if executor is None:
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks) or 1)))
+    else:
+        pool = nullcontext(executor)
+    with timed(metrics, 'translate'), pool as executor:
+        results = executor.map(
+            lambda job: _translate_chunk_safely(job[1], translator, target_lang, formality, limiter, metrics, budget,
+                                                source_lang=job[0], cancel=cancel),
+            chunks)
+        cancelled = 0
+        for (_, chunk), translated in zip(chunks, results):
+            if translated is CANCELLED:
+                cancelled += len(chunk)
+                continue
+            if progress is not None:
+                progress.advance(sum(len(text) for text in chunk))
+            if translated is None:
+                failed += len(chunk)
+                if failed_texts is not None:
+                    failed_texts.extend(chunk)
+                continue
+            # Stored without the source language, which is detected from the text itself anyway
+            for store in (checkpoint, cache):
+                if store is not None:
+                    store.put_many(translated, target_lang, formality=formality)
+            found.update(translated)
+
+    if failed:
+        logging.error(f"{failed} of {len(misses)} texts could not be translated.")
+        if metrics is not None:
+            metrics.count('texts_failed', failed)
+    if cancelled:
+        raise TranslationCancelled(f"Cancelled with {cancelled} of {len(misses)} texts not translated.")
+
+    return [found.get(text, text) for text in texts]
+
+
+def _column_texts(df, column_name, target_lang=None, latin_lang=None):
+    """Normalise a column to strings and return (mask of cells to translate, non-empty cells skipped).
+
+    Blanks are filled after the conversion, so they become '' rather than the text "nan". Cells
+    that translation would leave unchanged (numbers, codes, URLs, fillers, and text already in
+    target_lang, if given) are passed through.
+    """
+    texts = df[column_name]
+    if not isinstance(texts.dtype, pd.StringDtype) or texts.hasnans:
+        df[column_name] = texts = texts.astype(STRING_DTYPE).fillna('')
+    mask = translatable_mask(texts)
+    if target_lang is not None:
+        mask &= ~language_mask(texts, target_lang, latin_lang)
+    return mask, int((texts != "").sum()) - int(mask.sum())
+
+
+def translate_column(df, column_name, translator, target_lang='EN-US', cache=None, formality=None, workers=1,
+                     limiter=None, checkpoint=None, metrics=None, budget=None, latin_lang=None):
     """Batch translate a column using DeepL API while handling empty values."""
     if column_name not in df.columns:
         logging.warning(f"Column {column_name} not found, skipping translation.")
         return df
 
-    df[column_name] = df[column_name].astype(str).fillna('')
-    mask = df[column_name] != ""
+    mask, skipped = _column_texts(df, column_name, target_lang, latin_lang)
     texts_to_translate = df.loc[mask, column_name].tolist()
+    if metrics is not None:
+        metrics.count('cells_skipped', skipped)
 
     try:
         if texts_to_translate:
-            translations = translator.translate_text(texts_to_translate, target_lang=target_lang)
-            df.loc[mask, column_name] = [t.text for t in translations]
+            with timed(metrics, 'translate_column'):
+                df.loc[mask, column_name] = translate_texts(texts_to_translate, translator, target_lang,
+                                                            cache=cache, formality=formality, workers=workers,
+                                                            limiter=limiter, checkpoint=checkpoint,
+                                                            metrics=metrics, budget=budget, latin_lang=latin_lang)
     except Exception as e:
         logging.error(f"Error translating {column_name}: {e}")
 
     return df
+
+
+class TranslationPlan:
+    """Workbook-level translation plan that starts translating while later sheets are still being read.
+
+    Each unique text is translated once, in batches of up to `workers` at a time. Setting cancel stops batches at
+    their next chunk. In a dry run nothing is sent and the would-be characters are tallied in estimate.
+    """
+
+    def __init__(self, column_names, translator, target_lang='EN-US', cache=None, formality=None, workers=1,
+                 limiter=None, checkpoint=None, metrics=None, budget=None, dry_run=False, progress=None,
+                 cancel=None, latin_lang=None):
+        self.column_names = column_names
+        self.translator = translator
+        self.target_lang = target_lang
+        self.cache = cache
+        self.formality = formality
+        self.workers = max(1, workers)
+        self.limiter = limiter
+        self.checkpoint = checkpoint
+        self.metrics = metrics
+        self.budget = budget
+        self.dry_run = dry_run
+        self.progress = progress
+        self.cancel = cancel
+        self.latin_lang = latin_lang
+        self.cancelled = False
+        self.errors = []
+        self.failed_texts = []
+        self.estimate = {}
+        self.sheets = {}
+        self.total = 0
+        self.skipped = 0
+        self._masks = {}
+        self._planned = set()
+        self._pending = []
+        self._origins = {}
+        self._dispatched = 0
+        self._active = 0
+        self._closed = False
+        self._batches = []
+        self._needs = {}
+        self._collected = 0
+        self._collected_texts = 0
+        self._translated = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._chunks = ThreadPoolExecutor(max_workers=self.workers)
+
+    def add(self, sheet, df):
+        texts = {}
+        masks = {}
+        skipped = 0
+        for column_name in self.column_names:
+            if column_name not in df.columns:
+                logging.warning(f"Column {column_name} not found in {sheet}, skipping translation.")
+                continue
+            mask, column_skipped = _column_texts(df, column_name, self.target_lang, self.latin_lang)
+            skipped += column_skipped
+            masks[(sheet, column_name)] = mask
+            for text in df.loc[mask, column_name].unique():
+                texts.setdefault(text, column_name)
+
+        with self._lock:
+            self.sheets[sheet] = df
+            self._masks.update(masks)
+            cells = sum(int(mask.sum()) for mask in masks.values())
+            self.total += cells
+            self.skipped += skipped
+            batch = [text for text in texts if text not in self._planned]
+            self._planned.update(batch)
+            self._pending.extend(batch)
+            if self.dry_run:
+                self._origins.update((text, (sheet, texts[text])) for text in batch)
+            self._needs[sheet] = len(self._planned)
+            self._dispatch()
+        if self.progress is not None:
+            self.progress.add_work(sum(len(text) for text in batch))
+        if self.metrics is not None:
+            self.metrics.count('cells_to_translate', cells)
+            self.metrics.count('cells_skipped', skipped)
+            self.metrics.count('unique_texts', len(batch))
+
+    def _dispatch(self):
+        """Send all pending texts as one batch when no batch is running, or when they fill a request
+        and fewer than `workers` batches are running. Called with the lock held.
+        """
+        if not self._pending or self._closed:
+            return
+        if self._active and (self._active >= self.workers or len(self._pending) < MAX_TEXTS_PER_REQUEST):
+            return
+        batch, self._pending = self._pending, []
+        self._active += 1
+        future = self._executor.submit(self._run_batch, batch)
+        self._dispatched += len(batch)
+        self._batches.append((self._dispatched, batch, future))
+        self._ready.notify_all()
+
+    def _run_batch(self, batch):
+        try:
+            if self.dry_run:
+                return self._estimate(batch)
+            return translate_texts(batch, self.translator, self.target_lang, cache=self.cache,
+                                   formality=self.formality, limiter=self.limiter, checkpoint=self.checkpoint,
+                                   metrics=self.metrics, budget=self.budget, progress=self.progress,
+                                   cancel=self.cancel, executor=self._chunks, failed_texts=self.failed_texts,
+                                   latin_lang=self.latin_lang)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._dispatch()
+
+    def _estimate(self, batch):
+        """Dry-run stand-in for translate_texts: tally what would be sent and keep the source text."""
+        found = lookup_translations(batch, self.target_lang, self.cache, self.checkpoint, self.formality,
+                                    self.metrics)
+        with self._lock:
+            for text in batch:
+                if text not in found:
+                    entry = self.estimate.setdefault(self._origins[text], [0, 0])
+                    entry[0] += 1
+                    entry[1] += len(text)
+        if self.metrics is not None:
+            self.metrics.count('characters_estimated', sum(len(text) for text in batch if text not in found))
+        if self.progress is not None:
+            self.progress.advance(sum(len(text) for text in batch))
+        return [found.get(text, text) for text in batch]
+
+    @property
+    def estimated_characters(self):
+        return sum(characters for _, characters in self.estimate.values())
+
+    def log_estimate(self):
+        """Log the texts and characters a real run would send, per sheet and column."""
+        lines = [f"Dry run ({self.target_lang}): texts and characters that would be sent for translation",
+                 f"  {'sheet':<20}{'column':<24}{'texts':>10}{'characters':>14}"]
+        columns = {}
+        for (sheet, column_name), (count, characters) in self.estimate.items():
+            lines.append(f"  {sheet:<20}{column_name:<24}{count:>10,}{characters:>14,}")
+            total = columns.setdefault(column_name, [0, 0])
+            total[0] += count
+            total[1] += characters
+        for column_name, (count, characters) in columns.items():
+            lines.append(f"  {'(all sheets)':<20}{column_name:<24}{count:>10,}{characters:>14,}")
+        lines.append(f"  {'total':<44}{sum(c for c, _ in columns.values()):>10,}{self.estimated_characters:>14,}")
+        logging.info("\n".join(lines))
+
+    def _collect(self, count):
+        """Merge the results of the batches holding the first count planned texts into the translation table."""
+        with self._lock:
+            self._ready.wait_for(lambda: self._dispatched >= count)
+        while self._collected_texts < count:
+            self._collected_texts, batch, future = self._batches[self._collected]
+            try:
+                with timed(self.metrics, 'translate_wait'):
+                    translations = future.result()
+                self._translated.update(zip(batch, translations))
+            except TranslationCancelled:
+                self.cancelled = True
+            except Exception as e:
+                logging.error(f"Error translating workbook: {e}")
+                self.errors.append(e)
+            self._collected += 1
+
+    def result(self, sheet):
+        """Wait for the translations a sheet needs, write them back and release the sheet.
+
+        Raises TranslationCancelled if the run was cancelled before all of them were done.
+        """
+        with self._lock:
+            needs = self._needs.pop(sheet)
+        self._collect(needs)
+        if self.cancelled:
+            raise TranslationCancelled(f"Translation of {sheet} was cancelled.")
+
+        with self._lock:
+            df = self.sheets.pop(sheet)
+            masks = [(column_name, self._masks.pop((sheet, column_name), None)) for column_name in self.column_names]
+        for column_name, mask in masks:
+            if mask is not None:
+                df.loc[mask, column_name] = df.loc[mask, column_name].map(
+                    lambda text: self._translated.get(text, text))
+        return df
+
+    @property
+    def complete(self):
+        """False once any text kept its source text because of an error or the character budget."""
+        return not (self.errors or self.failed_texts or (self.budget is not None and self.budget.skipped))
+
+    def close(self):
+        """Wait for in-flight translations without writing them back; pending texts are dropped."""
+        with self._lock:
+            self._closed = True
+            self._pending = []
+        self._executor.shutdown(wait=True)
+        self._chunks.shutdown(wait=True)
+
+    def log_summary(self):
+        if self._planned:
+            logging.info(f"Translation plan ({self.target_lang}): {len(self._planned)} unique texts out of "
+                         f"{self.total} cells ({len(self._planned) / self.total:.1%}).")
+        if self.skipped:
+            logging.info(f"Skipped {self.skipped} cells that need no translation "
+                         f"(numbers, codes, URLs, fillers, text already in {self.target_lang}).")
+
+    def finish(self):
+        """Wait for all translations and write them back into the planned sheets."""
+        sheets = {sheet: self.result(sheet) for sheet in list(self.sheets)}
+        self.close()
+        self.log_summary()
+        return sheets
+
+
+class MultiTargetPlan:
+    """TranslationPlans for several target languages over the same sheets.
+
+    Sheets are read and prepared once and handed to every plan, each with its own copy of the new
+    rows and its own dispatch thread, so all languages translate concurrently. result() returns
+    the sheet translated into each language as {target_lang: df}.
+    """
+
+    def __init__(self, plans):
+        self.plans = plans
+
+    def add(self, sheet, df):
+        last = len(self.plans) - 1
+        for i, plan in enumerate(self.plans.values()):
+            plan.add(sheet, df if i == last else df.copy())
+
+    def result(self, sheet):
+        return {target_lang: plan.result(sheet) for target_lang, plan in self.plans.items()}
+
+    def close(self):
+        for plan in self.plans.values():
+            plan.close()
+
+    def log_summary(self):
+        # Texts already in a target language are skipped for that language only, so plans differ
+        for plan in self.plans.values():
+            plan.log_summary()
+
+    @property
+    def complete(self):
+        return all(plan.complete for plan in self.plans.values())
+
+    @property
+    def estimated_characters(self):
+        return sum(plan.estimated_characters for plan in self.plans.values())
+
+    def log_estimate(self):
+        for plan in self.plans.values():
+            plan.log_estimate()
+
+
+def translate_workbook(sheets, column_names, translator, target_lang='EN-US', cache=None, formality=None,
+                       workers=1, limiter=None, checkpoint=None, metrics=None, budget=None):
+    """Translate each unique text across all sheets and columns once, then scatter the results back."""
+    plan = TranslationPlan(column_names, translator, target_lang, cache=cache, formality=formality,
+                           workers=workers, limiter=limiter, checkpoint=checkpoint, metrics=metrics, budget=budget)
+    for sheet, df in sheets.items():
+        plan.add(sheet, df)
+    return plan.finish()
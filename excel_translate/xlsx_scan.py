@@ -0,0 +1,195 @@
+"""Lightweight .xlsx column extractor that scans the sheet XML directly.
+
+Only the requested columns are turned into Python values; everything else in the sheet is skipped
+while streaming, which makes this much cheaper than openpyxl when a few columns are all we need.
+Cell values match what openpyxl's read-only mode returns, so row fingerprints built from either
+reader are interchangeable.
+"""
+import os
+import posixpath
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+from excel_translate.excel_utils import parse_usecols, _header_names, _rows_to_frame
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_DIGITS = '0123456789'
+
+# Shared strings and date styles of the last workbooks read with a digest, by (path, digest): a
+# transform worker reads one sheet per call and would otherwise parse them again for every sheet
+_PARTS_CACHE_SIZE = 2
+_parts_cache = OrderedDict()
+_parts_lock = threading.Lock()
+
+
+def _resolve(target):
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def _read_sheets(zf):
+    """Return the workbook's [(sheet name, member path)] in tab order and its date epoch."""
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): _resolve(rel.get('Target')) for rel in rels.iter(f"{PKG_REL_NS}Relationship")}
+
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    pr = workbook.find(f"{NS}workbookPr")
+    epoch = CALENDAR_MAC_1904 if pr is not None and pr.get('date1904') in ('1', 'true') else CALENDAR_WINDOWS_1900
+    sheets = [(sheet.get('name'), targets[sheet.get(f"{REL_NS}id")]) for sheet in workbook.iter(f"{NS}sheet")]
+    return sheets, epoch
+
+
+def _read_shared_strings(zf):
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{NS}si":
+                # Plain text or rich-text runs; phonetic hints (rPh) are not part of the value
+                parts = [elem.findtext(f"{NS}t") or '']
+                parts.extend(run.findtext(f"{NS}t") or '' for run in elem.findall(f"{NS}r"))
+                strings.append(''.join(parts))
+                elem.clear()
+    return strings
+
+
+def _read_date_styles(zf):
+    """Return the sets of cellXfs style indexes that format numbers as dates, and as durations.
+
+    Durations ([h]:mm:ss) are date formats too; like openpyxl, their cells become timedeltas.
+    """
+    if 'xl/styles.xml' not in zf.namelist():
+        return set(), set()
+    styles = ET.fromstring(zf.read('xl/styles.xml'))
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in styles.iter(f"{NS}numFmt"):
+        formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+    cell_xfs = styles.find(f"{NS}cellXfs")
+    if cell_xfs is None:
+        return set(), set()
+    codes = [formats.get(int(xf.get('numFmtId', 0)), '') for xf in cell_xfs.findall(f"{NS}xf")]
+    return ({i for i, code in enumerate(codes) if is_date_format(code)},
+            {i for i, code in enumerate(codes) if is_timedelta_format(code)})
+
+
+def _read_parts(zf, file_path, digest=None):
+    """Return (shared strings, date styles, duration styles), reused across calls when digest is given."""
+    if digest is None:
+        return (_read_shared_strings(zf), *_read_date_styles(zf))
+    key = (os.path.abspath(file_path), digest)
+    with _parts_lock:
+        parts = _parts_cache.get(key)
+        if parts is not None:
+            _parts_cache.move_to_end(key)
+            return parts
+    parts = (_read_shared_strings(zf), *_read_date_styles(zf))
+    with _parts_lock:
+        _parts_cache[key] = parts
+        while len(_parts_cache) > _PARTS_CACHE_SIZE:
+            _parts_cache.popitem(last=False)
+    return parts
+
+
+def _cell_value(cell, shared_strings, date_styles, timedelta_styles, epoch):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        node = cell.find(f"{NS}is")
+        return ''.join(t.text or '' for t in node.iter(f"{NS}t")) if node is not None else None
+
+    value = cell.findtext(f"{NS}v")
+    if not value:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return bool(int(value))
+    if cell_type in ('str', 'e'):
+        return value
+    if cell_type == 'd':
+        return from_ISO8601(value)
+
+    number = float(value) if any(c in value for c in '.Ee') else int(value)
+    style = int(cell.get('s', 0))
+    if style in date_styles:
+        try:
+            return from_excel(number, epoch, timedelta=style in timedelta_styles)
+        except (OverflowError, ValueError):
+            return '#VALUE!'  # What openpyxl reads for a serial outside the date range
+    return number
+
+
+def list_sheets(file_path):
+    """Return the workbook's sheet names in tab order without parsing any sheet data."""
+    with zipfile.ZipFile(file_path) as zf:
+        return [sheet for sheet, _ in _read_sheets(zf)[0]]
+
+
+def iter_xlsx_columns(file_path, columns, chunk_rows=None, sheets=None, digest=None):
+    """Yield (sheet, DataFrame) pairs holding only the given columns, like excel_utils.iter_excel.
+
+    sheets optionally restricts the scan to the named sheets, which lets separate processes
+    each read their own sheet of the same workbook. Given the file's digest, its shared strings
+    and styles are parsed once per process and reused by later calls for other sheets.
+    """
+    positions = parse_usecols(columns)
+    wanted = {position: slot for slot, position in enumerate(positions)}
+    width = len(positions)
+    column_positions = {}
+
+    with zipfile.ZipFile(file_path) as zf:
+        members, epoch = _read_sheets(zf)
+        if sheets is not None:
+            members = [(sheet, member) for sheet, member in members if sheet in sheets]
+        shared_strings, date_styles, timedelta_styles = _read_parts(zf, file_path, digest)
+
+        for sheet, member in members:
+            header = None
+            batch = []
+            start = 0
+            with zf.open(member) as f:
+                for _, row in ET.iterparse(f):
+                    if row.tag != f"{NS}row":
+                        continue
+                    values = [None] * width
+                    position = -1
+                    for cell in row.iter(f"{NS}c"):
+                        ref = cell.get('r')
+                        if ref:
+                            letters = ref.rstrip(_DIGITS)
+                            position = column_positions.get(letters)
+                            if position is None:
+                                position = column_positions[letters] = column_index_from_string(letters) - 1
+                        else:
+                            position += 1
+                        slot = wanted.get(position)
+                        if slot is not None:
+                            values[slot] = _cell_value(cell, shared_strings, date_styles, timedelta_styles, epoch)
+                    row_number = int(row.get('r', 0))
+                    row.clear()
+
+                    if header is None:
+                        if row_number > 1:
+                            header = [None] * width  # Row 1 missing entirely
+                        else:
+                            header = values
+                            continue
+                    if all(value is None for value in values):
+                        continue
+                    batch.append(tuple(values))
+                    if chunk_rows and len(batch) >= chunk_rows:
+                        yield sheet, _rows_to_frame(_header_names(header), batch, start)
+                        start += len(batch)
+                        batch = []
+
+            if header is None:
+                continue
+            if batch or not start:
+                yield sheet, _rows_to_frame(_header_names(header), batch, start)
+
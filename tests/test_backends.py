@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import deepl
+import pytest
+
+from excel_translate.backends import CoalescingTranslator, FakeTranslator, create_translator
+from excel_translate.ratelimit import RateLimiter
+
+
+def _concurrently(count, call):
+    """Run call() on count threads released at the same moment and return the results."""
+    barrier = threading.Barrier(count)
+
+    def run(_):
+        barrier.wait()
+        return call()
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(run, range(count)))
+
+
+def test_concurrent_duplicate_texts_share_one_upstream_call():
+    fake = FakeTranslator(latency=0.3)
+    translator = CoalescingTranslator(fake)
+
+    results = _concurrently(4, lambda: [r.text for r in translator.translate_text(['苹果', '香蕉'],
+                                                                                  target_lang='EN-US')])
+
+    assert results == [['[EN-US] 苹果', '[EN-US] 香蕉']] * 4
+    assert fake.requests == 1
+    assert fake.characters == 4
+    assert translator.coalesced == 6
+
+
+def test_only_texts_not_in_flight_are_sent():
+    fake = FakeTranslator(latency=0.3)
+    translator = CoalescingTranslator(fake)
+    first = threading.Thread(target=translator.translate_text, args=(['苹果'],), kwargs={'target_lang': 'DE'})
+    first.start()
+    while not translator._in_flight:
+        pass
+
+    results = translator.translate_text(['苹果', '香蕉'], target_lang='DE')
+    first.join()
+
+    assert [r.text for r in results] == ['[DE] 苹果', '[DE] 香蕉']
+    assert fake.requests == 2
+    assert fake.characters == 4
+
+
+def test_different_target_languages_are_not_merged():
+    fake = FakeTranslator(latency=0.2)
+    translator = CoalescingTranslator(fake)
+    langs = iter(['EN-US', 'DE'])
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            lang = next(langs)
+        return translator.translate_text('苹果', target_lang=lang).text
+
+    assert sorted(_concurrently(2, call)) == ['[DE] 苹果', '[EN-US] 苹果']
+    assert fake.requests == 2
+
+
+def test_failures_reach_every_waiting_request_and_are_not_remembered():
+    fake = FakeTranslator(latency=0.2, character_limit=0)
+    translator = CoalescingTranslator(fake)
+
+    def call():
+        with pytest.raises(deepl.QuotaExceededException):
+            translator.translate_text(['苹果'], target_lang='EN-US')
+
+    _concurrently(3, call)
+    assert fake.requests == 1
+    assert not translator._in_flight
+
+    fake.character_limit = None
+    assert translator.translate_text('苹果', target_lang='EN-US').text == '[EN-US] 苹果'
+    assert fake.requests == 2
+
+
+def test_only_the_deepl_backend_turns_off_the_client_retries(monkeypatch):
+    monkeypatch.setattr(deepl.http_client, 'max_network_retries', 5)
+    RateLimiter()
+    create_translator('fake')
+    assert deepl.http_client.max_network_retries == 5
+
+    create_translator('deepl', 'test-key:fx')
+    assert deepl.http_client.max_network_retries == 0
@@ -0,0 +1,128 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+import pytest
+
+from excel_translate import batch
+from excel_translate.backends import FakeTranslator
+from excel_translate.batch import BatchRunner, WorkbookPair, read_manifest, watch_folder
+from excel_translate.fingerprint import sidecar_path
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data')
+PREVIOUS = os.path.join(TEST_DATA, 'test_data_prev.xlsx')
+NEW = os.path.join(TEST_DATA, 'test_data_new.xlsx')
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class _Runner:
+    """Stands in for BatchRunner: records the pairs it is given and reports the set outcome."""
+
+    def __init__(self, ok=True, **options):
+        self.ok = ok
+        self.options = options
+        self.cancel = threading.Event()
+        self.pairs = []
+
+    def run(self, pair):
+        self.pairs.append(pair)
+        return self.ok
+
+
+def _watched(tmp_path, name='book.xlsx', previous=True):
+    root = tmp_path / 'watch'
+    for folder in ('inbox', 'previous'):
+        (root / folder).mkdir(parents=True)
+    shutil.copy(NEW, root / 'inbox' / name)
+    if previous:
+        shutil.copy(PREVIOUS, root / 'previous' / name)
+    return root
+
+
+def test_read_manifest_csv_resolves_paths_and_default_output(tmp_path):
+    manifest = tmp_path / 'pairs.csv'
+    manifest.write_text("Previous,New,Output\nold/a.xlsx,new/a.xlsx,\nold/b.xlsx,new/b.xlsx,out/b.xlsx\n",
+                        encoding='utf-8')
+
+    assert read_manifest(str(manifest)) == [
+        WorkbookPair(str(tmp_path / 'old/a.xlsx'), str(tmp_path / 'new/a.xlsx'),
+                     str(tmp_path / 'new/a_translated.xlsx')),
+        WorkbookPair(str(tmp_path / 'old/b.xlsx'), str(tmp_path / 'new/b.xlsx'), str(tmp_path / 'out/b.xlsx')),
+    ]
+
+
+def test_read_manifest_json_needs_both_files(tmp_path):
+    manifest = tmp_path / 'pairs.json'
+    manifest.write_text(json.dumps([{'previous': 'a.xlsx', 'new': 'b.xlsx'}, {'new': 'c.xlsx'}]), encoding='utf-8')
+    with pytest.raises(ValueError, match='entry 2'):
+        read_manifest(str(manifest))
+
+
+def test_translated_workbook_replaces_previous_version(tmp_path):
+    root = _watched(tmp_path)
+    (root / 'inbox' / 'book.xlsx.rowindex.npz').write_bytes(b'index')
+    runner = _Runner(ok=True)
+
+    assert watch_folder(runner, str(root), once=True) == 0
+    assert runner.pairs == [WorkbookPair(str(root / 'previous' / 'book.xlsx'), str(root / 'inbox' / 'book.xlsx'),
+                                         str(root / 'output' / 'book.xlsx'))]
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(NEW)
+    assert (root / 'previous' / 'book.xlsx.rowindex.npz').read_bytes() == b'index'
+    assert os.listdir(root / 'inbox') == []
+
+
+def test_failed_workbook_leaves_previous_version_alone(tmp_path):
+    root = _watched(tmp_path)
+    (root / 'previous' / 'book.xlsx.rowindex.npz').write_bytes(b'index')
+
+    assert watch_folder(_Runner(ok=False), str(root), once=True) == 1
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(PREVIOUS)
+    assert os.path.exists(sidecar_path(str(root / 'previous' / 'book.xlsx')))
+    assert _digest(root / 'failed' / 'book.xlsx') == _digest(NEW)
+    assert os.listdir(root / 'inbox') == []
+
+
+def test_cancelled_workbook_stays_in_inbox(tmp_path):
+    root = _watched(tmp_path)
+    runner = _Runner(ok=False)
+    runner.run = lambda pair: runner.cancel.set() or False
+
+    assert watch_folder(runner, str(root), once=True) == 0
+    assert os.listdir(root / 'inbox') == ['book.xlsx']
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(PREVIOUS)
+
+
+def test_workbook_without_previous_version_is_skipped(tmp_path):
+    root = _watched(tmp_path, previous=False)
+    runner = _Runner()
+
+    assert watch_folder(runner, str(root), once=True) == 0
+    assert runner.pairs == []
+    assert os.listdir(root / 'inbox') == ['book.xlsx']
+
+
+def test_dry_run_is_refused(tmp_path):
+    root = _watched(tmp_path)
+    with pytest.raises(ValueError):
+        watch_folder(_Runner(dry_run=True), str(root), once=True)
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(PREVIOUS)
+
+    assert batch.main(['--watch', str(root), '--once', '--dry-run', '--backend', 'fake']) == batch.EXIT_USAGE
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(PREVIOUS)
+    assert not (root / 'output').exists()
+
+
+def test_watch_folder_translates_with_a_real_runner(tmp_path):
+    root = _watched(tmp_path)
+    with BatchRunner(translator=FakeTranslator(), cache_path=':memory:', processes=1) as runner:
+        assert watch_folder(runner, str(root), once=True) == 0
+
+    assert os.path.exists(root / 'output' / 'book.xlsx')
+    assert _digest(root / 'previous' / 'book.xlsx') == _digest(NEW)
+    assert os.path.exists(sidecar_path(str(root / 'previous' / 'book.xlsx')))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from excel_translate.fingerprint import RowIndex, load_sidecar, save_sidecar
+
+
+def _frame(*names):
+    return pd.DataFrame({'产品名': list(names), '数量': 1})
+
+
+def test_sheet_names_that_are_savez_arguments_round_trip(tmp_path):
+    index = RowIndex.from_frames({name: _frame('a', 'b') for name in ('file', 'allow_pickle', '__meta__', '家用电器')})
+    path = tmp_path / 'index.npz'
+    index.save(path)
+
+    loaded = RowIndex.load(path)
+    assert list(loaded.keys()) == ['file', 'allow_pickle', '__meta__', '家用电器']
+    for sheet in index.keys():
+        np.testing.assert_array_equal(loaded.sheets[sheet], index.sheets[sheet])
+
+
+def test_repeated_rows_beyond_the_previous_count_are_new():
+    previous = pd.DataFrame({'产品名': ['椅子', '桌子', '椅子'], '数量': [1, 2, 1]})
+    new = pd.DataFrame({'产品名': ['椅子', '椅子', '桌子', '椅子', '沙发', '桌子'], '数量': [1, 1, 2, 1, 3, 2]})
+    index = RowIndex.from_frames({'家用电器': previous})
+
+    assert index.new_rows('家用电器', new).tolist() == [False, False, False, True, True, True]
+
+
+def test_rows_added_in_chunks_keep_their_repeats():
+    index = RowIndex()
+    index.add('家用电器', _frame('椅子'))
+    index.add('家用电器', _frame('椅子'))
+    assert index.new_rows('家用电器', _frame('椅子', '椅子', '椅子')).tolist() == [False, False, True]
+    assert index.new_rows('厨房用品', _frame('椅子')).tolist() == [True]
+
+
+def test_sidecar_round_trip_and_settings_mismatch(tmp_path):
+    workbook = tmp_path / 'new.xlsx'
+    workbook.write_bytes(b'not really a workbook')
+    index = RowIndex.from_frames({'file': _frame('椅子', '椅子')})
+    save_sidecar(str(workbook), index, settings={'remove': ['汇总']})
+
+    loaded = load_sidecar(str(workbook), settings={'remove': ['汇总']})
+    assert loaded is not None
+    assert loaded.new_rows('file', _frame('椅子', '椅子', '椅子')).tolist() == [False, False, True]
+    assert load_sidecar(str(workbook), settings={'remove': []}) is None
+    assert (tmp_path / 'new.xlsx.rowindex.npz').exists()
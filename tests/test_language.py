@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from excel_translate.language import detect_language, language_mask
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('家用电器', 'ZH'),
+    ('蓝色 blue chair', 'ZH'),
+    ('キッチン用品', 'JA'),
+    ('東京タワー', 'JA'),
+    ('주방 용품', 'KO'),
+    ('Keep the blender away from water', 'EN'),
+    ('Suitable for indoor use with children', 'EN'),
+    ('Der Stuhl ist aus Holz und Metall', None),
+    ('La chaise est pour la cuisine', None),
+    ('Café crème', None),
+    ('Größe', None),
+    ('indoor', None),
+    ('Guten Tag Stuhl', None),
+    ('Ветер', None),
+    ('12345', None),
+    ('', None),
+])
+def test_detect_language(text, expected):
+    assert detect_language(text) == expected
+
+
+def test_latin_lang_decides_only_text_without_clues():
+    assert detect_language('indoor', latin_lang='EN') == 'EN'
+    assert detect_language('Outdoor, 2 people', latin_lang='en-us') == 'EN'
+    assert detect_language('Der Stuhl und der Tisch', latin_lang='EN') is None
+    assert detect_language('Größe', latin_lang='EN') is None
+    assert detect_language('家用电器', latin_lang='EN') == 'ZH'
+
+
+def test_language_mask():
+    texts = pd.Series(['家用电器', 'Use with care', 'indoor', '家用电器', 'Der Stuhl ist neu'], dtype='string')
+
+    np.testing.assert_array_equal(language_mask(texts, 'EN-US'), [False, True, False, False, False])
+    np.testing.assert_array_equal(language_mask(texts, 'EN-GB', latin_lang='EN'),
+                                  [False, True, True, False, False])
+    np.testing.assert_array_equal(language_mask(texts, 'ZH'), [True, False, False, True, False])
+    np.testing.assert_array_equal(language_mask(texts, 'DE'), [False] * 5)
+    np.testing.assert_array_equal(language_mask(texts, 'DE', latin_lang='DE'), [False, False, True, False, False])
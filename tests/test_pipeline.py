@@ -0,0 +1,40 @@
+import os
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+from excel_translate.backends import FakeTranslator
+from excel_translate.excel_utils import ExcelStreamWriter
+from excel_translate.pipeline import process_files
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data')
+
+
+def test_run_cancelled_before_any_sheet_keeps_the_earlier_output(tmp_path):
+    for name in ('test_data_prev.xlsx', 'test_data_new.xlsx'):
+        shutil.copy(os.path.join(TEST_DATA, name), tmp_path / name)
+    output = tmp_path / 'out.xlsx'
+    pd.DataFrame({'Product': ['earlier run']}).to_excel(output, sheet_name='earlier', index=False)
+    cancel = threading.Event()
+    cancel.set()
+
+    ok = process_files(str(tmp_path / 'test_data_prev.xlsx'), str(tmp_path / 'test_data_new.xlsx'), str(output),
+                       translator=FakeTranslator(), cache_path=':memory:', processes=1, cancel=cancel)
+
+    assert not ok
+    assert list(pd.read_excel(output, sheet_name=None)) == ['earlier']
+    assert not os.path.exists(f"{output}.partial")
+
+
+def test_writer_leaving_on_an_error_before_any_sheet_saves_nothing(tmp_path):
+    path = str(tmp_path / 'out.xlsx')
+    with pytest.raises(RuntimeError):
+        with ExcelStreamWriter(path):
+            raise RuntimeError("read failed")
+    assert not os.path.exists(path)
+
+    with ExcelStreamWriter(path):
+        pass
+    assert list(pd.read_excel(path, sheet_name=None)) == ['Sheet']
@@ -0,0 +1,192 @@
+import os
+import io
+import json
+import time
+import uuid
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from excel_translate.backends import FakeTranslator
+from excel_translate.cache import TranslationCache
+from excel_translate.service import TranslationService
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data')
+
+
+class Client:
+    def __init__(self, port):
+        self.base = f"http://127.0.0.1:{port}"
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        request = urllib.request.Request(self.base + path, data=body, method=method,
+                                         headers={'Content-Type': content_type} if body is not None else {})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.headers.get_content_type(), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get_content_type(), e.read()
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        status, _, content = self.request(method, path, body)
+        return status, json.loads(content)
+
+    def wait(self, job_id, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            _, job = self.json('GET', f"/jobs/{job_id}")
+            if job['status'] not in ('queued', 'running'):
+                return job
+            time.sleep(0.05)
+        raise AssertionError(f"job {job_id} did not finish")
+
+
+def _serve(fake, work_dir, **options):
+    """Start a service on a free port on a background event loop; returns (service, client, stop)."""
+    cache = TranslationCache(':memory:')
+    service = TranslationService(fake, cache, str(work_dir), **options)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    holder = {}
+
+    async def main():
+        holder['stop'] = asyncio.Event()
+        holder['server'] = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        started.set()
+        async with holder['server']:
+            await holder['stop'].wait()
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(main(),), daemon=True)
+    thread.start()
+    assert started.wait(5)
+    port = holder['server'].sockets[0].getsockname()[1]
+
+    def stop():
+        loop.call_soon_threadsafe(holder['stop'].set)
+        thread.join(5)
+        loop.close()
+        service.close()
+        cache.close()
+
+    return service, Client(port), stop
+
+
+@pytest.fixture
+def fake():
+    return FakeTranslator(latency=0.2)
+
+
+@pytest.fixture
+def served(fake, tmp_path):
+    service, client, stop = _serve(fake, tmp_path, workers=4)
+    yield service, client
+    stop()
+
+
+def test_health(served):
+    _, client = served
+    assert client.json('GET', '/health') == (200, {'status': 'ok', 'jobs': 0})
+
+
+def test_concurrent_jobs_send_identical_texts_upstream_once(served, fake):
+    _, client = served
+    texts = [f"测试文本{i}" for i in range(120)] + ['12345', 'https://example.com', '']
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: client.json('POST', '/translate?wait=1', {'texts': texts}),
+                                      range(4)))
+
+    for status, job in responses:
+        assert status == 200
+        assert job['status'] == 'done'
+        assert job['translations'][:2] == ['[EN-US] 测试文本0', '[EN-US] 测试文本1']
+        assert job['translations'][-3:] == ['12345', 'https://example.com', '']
+    unique_characters = sum(len(text) for text in texts[:120])
+    assert fake.characters == unique_characters
+    assert fake.requests == 3  # 120 texts in chunks of 50, sent once for all four jobs
+
+
+def test_job_status_lifecycle(served):
+    _, client = served
+
+    status, job = client.json('POST', '/translate', {'texts': ['你好', '世界'], 'target_lang': 'de'})
+    assert status == 202
+    assert job['status'] in ('queued', 'running')
+    assert job['status_url'] == f"/jobs/{job['id']}"
+
+    done = client.wait(job['id'])
+    assert done['status'] == 'done'
+    assert done['kind'] == 'texts'
+    assert done['translations'] == ['[DE] 你好', '[DE] 世界']
+    assert done['finished'] >= done['created']
+    assert done['progress']['fraction'] == 1.0
+    assert done['metrics']['requests'] == 1
+
+
+def test_delete_cancels_a_running_job(fake, tmp_path):
+    fake.latency = 0.5
+    service, client, stop = _serve(fake, tmp_path, workers=1)
+    try:
+        _, job = client.json('POST', '/translate', {'texts': [f"取消{i}" for i in range(1000)]})
+        status, _ = client.json('DELETE', f"/jobs/{job['id']}")
+        assert status == 202
+
+        cancelled = client.wait(job['id'])
+        assert cancelled['status'] == 'cancelled'
+        assert 'translations' not in cancelled
+        assert fake.requests < 20
+    finally:
+        stop()
+
+
+def test_unknown_job_and_route(served):
+    _, client = served
+    assert client.json('GET', '/jobs/missing') == (404, {'error': 'No job missing'})
+    assert client.json('GET', '/nowhere')[0] == 404
+    assert client.json('POST', '/translate', {'texts': 'not a list'})[0] == 400
+
+
+def _multipart(files):
+    boundary = uuid.uuid4().hex
+    body = b''
+    for name, path in files.items():
+        with open(path, 'rb') as f:
+            body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{name}.xlsx\"\r\n"
+                     "Content-Type: application/octet-stream\r\n\r\n").encode('utf-8') + f.read() + b"\r\n"
+    return body + f"--{boundary}--\r\n".encode('utf-8'), f"multipart/form-data; boundary={boundary}"
+
+
+def test_workbook_upload_round_trip(served):
+    _, client = served
+    body, content_type = _multipart({'previous': os.path.join(TEST_DATA, 'test_data_prev.xlsx'),
+                                     'new': os.path.join(TEST_DATA, 'test_data_new.xlsx')})
+
+    status, _, content = client.request('POST', '/workbooks?target_lang=EN-US,DE', body, content_type)
+    assert status == 202
+    job = client.wait(json.loads(content)['id'])
+    assert job['status'] == 'done', job
+    assert job['output_url'] == f"/jobs/{job['id']}/output"
+
+    status, content_type, content = client.request('GET', job['output_url'])
+    assert status == 200
+    assert content_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    sheets = pd.read_excel(io.BytesIO(content), sheet_name=None)
+    assert list(sheets) == ['家用电器', '厨房用品', '美容护理']
+    for df in sheets.values():
+        assert {'Product_EN-US', 'Product_DE', 'Scene_EN-US', 'Scene_DE'} <= set(df.columns)
+        assert df['Product_EN-US'].str.startswith('[EN-US] ').all()
+        assert df['Product_DE'].str.startswith('[DE] ').all()
+
+
+def test_workbook_upload_needs_both_files(served):
+    _, client = served
+    body, content_type = _multipart({'new': os.path.join(TEST_DATA, 'test_data_new.xlsx')})
+    status, _, content = client.request('POST', '/workbooks', body, content_type)
+    assert status == 400
+    assert 'previous' in json.loads(content)['error']
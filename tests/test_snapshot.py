@@ -0,0 +1,76 @@
+import os
+import shutil
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from excel_translate.backends import FakeTranslator
+from excel_translate.metrics import Metrics
+from excel_translate.pipeline import process_files
+from excel_translate.snapshot import read_sheet, snapshot_dir, write_sheet
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data')
+
+
+def test_write_and_read_sheet_round_trip(tmp_path):
+    mixed = ['家用电器', 42, 2.5, True, None, datetime.datetime(2024, 5, 1, 8, 30), datetime.date(2024, 5, 2),
+             datetime.time(17, 45), datetime.timedelta(hours=36, seconds=1), float('nan')]
+    rows = len(mixed)
+    df = pd.DataFrame({
+        '混合': pd.Series(mixed, dtype=object),
+        'text': pd.Series(['a', pd.NA, 'ü'] * 3 + [''], dtype='string'),
+        'int': np.arange(rows, dtype=np.int64),
+        'float': [1.5, np.nan] * (rows // 2),
+        'when': pd.Series([pd.Timestamp('2024-01-01 12:00'), pd.NaT] * (rows // 2), dtype='datetime64[ns]'),
+        'flag': [True, False] * (rows // 2),
+    })
+    hashes = np.arange(rows, dtype=np.uint64) * 977
+    path = str(tmp_path / '0.npy')
+
+    write_sheet(path, '家用电器', df, hashes)
+    loaded, loaded_hashes = read_sheet(path)
+
+    np.testing.assert_array_equal(loaded_hashes, hashes)
+    assert list(loaded.columns) == list(df.columns)
+    assert list(loaded.dtypes) == list(df.dtypes)
+    pd.testing.assert_frame_equal(loaded.drop(columns='混合'), df.drop(columns='混合'))
+    # Blank cells of object columns (None, NaN) all come back as None
+    assert loaded['混合'].tolist() == mixed[:4] + [None] + mixed[5:9] + [None]
+    assert [type(value) for value in loaded['混合'][:9]] == [type(value) for value in mixed[:9]]
+
+
+def test_write_and_read_empty_sheet(tmp_path):
+    df = pd.DataFrame({'产品名': pd.Series([], dtype=object), 'int': np.array([], dtype=np.int64)})
+    path = str(tmp_path / '0.npy')
+    write_sheet(path, 'empty', df, np.array([], dtype=np.uint64))
+
+    loaded, hashes = read_sheet(path)
+    assert len(loaded) == 0 and len(hashes) == 0
+    assert list(loaded.columns) == ['产品名', 'int']
+
+
+def _run(tmp_path, **options):
+    for name in ('test_data_prev.xlsx', 'test_data_new.xlsx'):
+        if not os.path.exists(tmp_path / name):
+            shutil.copy(os.path.join(TEST_DATA, name), tmp_path / name)
+    metrics = Metrics()
+    ok = process_files(str(tmp_path / 'test_data_prev.xlsx'), str(tmp_path / 'test_data_new.xlsx'),
+                       str(tmp_path / 'out.xlsx'), translator=FakeTranslator(), cache_path=':memory:', processes=1,
+                       metrics=metrics, **options)
+    return ok, metrics.to_dict()['counters']
+
+
+def test_rerun_of_an_incomplete_run_reads_the_snapshot(tmp_path):
+    ok, counters = _run(tmp_path, char_budget=3)
+    assert not ok
+    assert 'snapshot_hits' not in counters
+    assert len(os.listdir(snapshot_dir(str(tmp_path / 'out.xlsx')))) == 1
+
+    ok, counters = _run(tmp_path)
+    assert ok
+    assert counters['snapshot_hits'] == 1
+    assert counters['rows_read'] == 9
+    sheets = pd.read_excel(tmp_path / 'out.xlsx', sheet_name=None)
+    assert list(sheets) == ['家用电器', '厨房用品', '美容护理']
+    assert all(df['Product'].str.startswith('[EN-US] ').all() for df in sheets.values())
@@ -0,0 +1,76 @@
+import json
+import time
+
+import deepl
+import pytest
+
+from excel_translate.ratelimit import RateLimiter
+from excel_translate.translator import (chunk_texts, translate_texts, _translate_chunk, MAX_REQUEST_BYTES,
+                                        MAX_TEXTS_PER_REQUEST)
+
+
+def test_chunks_are_bounded_by_count():
+    chunks = list(chunk_texts([f"text {i}" for i in range(120)]))
+    assert [len(chunk) for chunk in chunks] == [MAX_TEXTS_PER_REQUEST, MAX_TEXTS_PER_REQUEST, 20]
+
+
+def test_chunks_are_bounded_by_escaped_json_size():
+    texts = ['测试' * 2500] * 40  # 15 KB of UTF-8 each, but 30 KB once ASCII-escaped
+    chunks = list(chunk_texts(texts))
+    assert sum(chunks, []) == texts
+    for chunk in chunks:
+        assert len(json.dumps({'text': chunk, 'target_lang': 'EN-US'})) < 128 * 1024
+        assert len(json.dumps(chunk)) <= MAX_REQUEST_BYTES + 1
+
+
+class _Rejecting:
+    """Translator whose every request fails with the given error."""
+
+    def __init__(self, error):
+        self.error = error
+        self.requests = 0
+
+    def translate_text(self, texts, **kwargs):
+        self.requests += 1
+        raise self.error
+
+
+def test_requests_rejected_as_invalid_are_not_retried():
+    translator = _Rejecting(deepl.DeepLException("Request entity too large", http_status_code=413))
+    limiter = RateLimiter(rate=1000)
+    with pytest.raises(deepl.DeepLException):
+        _translate_chunk(['你好'], translator, 'EN-US', limiter=limiter)
+    assert translator.requests == 1
+    assert limiter.retries == 0
+
+
+def test_server_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    translator = _Rejecting(deepl.DeepLException("Bad gateway", http_status_code=502))
+    with pytest.raises(deepl.DeepLException):
+        _translate_chunk(['你好'], translator, 'EN-US', attempts=3)
+    assert translator.requests == 3
+
+
+class _Recording:
+    """Translator that records the source language and texts of each request."""
+
+    def __init__(self):
+        self.sent = []
+
+    def translate_text(self, texts, target_lang, source_lang=None, **kwargs):
+        self.sent.append((source_lang, list(texts)))
+        return [type('Result', (), {'text': f"[{target_lang}] {text}"})() for text in texts]
+
+
+def test_texts_are_grouped_by_source_language_and_target_language_text_is_kept():
+    translator = _Recording()
+    texts = ['你好', 'Use with care', 'indoor', '東京タワー', '你好']
+
+    assert translate_texts(texts, translator, 'EN-US') == [
+        '[EN-US] 你好', 'Use with care', '[EN-US] indoor', '[EN-US] 東京タワー', '[EN-US] 你好']
+    assert dict(translator.sent) == {None: ['indoor'], 'JA': ['東京タワー'], 'ZH': ['你好']}
+
+    translator.sent.clear()
+    assert translate_texts(texts, translator, 'EN-US', latin_lang='EN')[2] == 'indoor'
+    assert dict(translator.sent) == {'JA': ['東京タワー'], 'ZH': ['你好']}
@@ -0,0 +1,97 @@
+import os
+import zipfile
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from excel_translate import xlsx_scan
+from excel_translate.excel_utils import file_digest, iter_excel
+from excel_translate.fingerprint import row_fingerprints
+
+TEST_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_data',
+                         'test_data_new.xlsx')
+COLUMNS = 'A:C'
+
+
+def _typed_workbook(path):
+    """Write a workbook with dates, durations, booleans, errors, blanks and formulas with cached results."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '数据'
+    ws.append(['名称', '日期', '时长', '时间', '标志', '公式', '文本公式', '错误'])
+    ws.append(['椅子', datetime.datetime(2024, 5, 1, 8, 30), datetime.timedelta(hours=36, minutes=5),
+               datetime.time(17, 45), True, '=1+1', '=A2&"x"', None])
+    ws.append(['桌子', datetime.date(2024, 5, 2), datetime.timedelta(minutes=90), None, False, '=2.5*2', '=A3',
+               None])
+    ws.append([None, None, None, None, None, None, None, 3])
+    for row in (2, 3):
+        ws[f'C{row}'].number_format = '[h]:mm:ss'
+        ws[f'D{row}'].number_format = 'hh:mm'
+    wb.save(path)
+
+    # openpyxl writes formulas without cached results; add them as Excel would
+    cached = {'<c r="F2"><f>1+1</f><v /></c>': '<c r="F2"><f>1+1</f><v>2</v></c>',
+              '<c r="G2"><f>A2&amp;"x"</f><v /></c>': '<c r="G2" t="str"><f>A2&amp;"x"</f><v>椅子x</v></c>',
+              '<c r="F3"><f>2.5*2</f><v /></c>': '<c r="F3"><f>2.5*2</f><v>5.0</v></c>',
+              '<c r="G3"><f>A3</f><v /></c>': '<c r="G3" t="str"><f>A3</f><v>桌子</v></c>',
+              '<c r="H4" t="n"><v>3</v></c>': '<c r="H4" t="e"><v>#DIV/0!</v></c>'}
+    with zipfile.ZipFile(path) as zf:
+        members = {name: zf.read(name) for name in zf.namelist()}
+    sheet = members['xl/worksheets/sheet1.xml'].decode('utf-8')
+    for written, excel in cached.items():
+        assert written in sheet
+        sheet = sheet.replace(written, excel)
+    members['xl/worksheets/sheet1.xml'] = sheet.encode('utf-8')
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture(params=['sample', 'typed'])
+def workbook(request, tmp_path):
+    return TEST_FILE if request.param == 'sample' else _typed_workbook(tmp_path / 'typed.xlsx')
+
+
+def test_matches_openpyxl_reader(workbook):
+    scanned = list(xlsx_scan.iter_xlsx_columns(workbook, 'A:H'))
+    loaded = list(iter_excel(workbook, 'A:H'))
+
+    assert [sheet for sheet, _ in scanned] == [sheet for sheet, _ in loaded]
+    for (_, scanned_df), (_, loaded_df) in zip(scanned, loaded):
+        pd.testing.assert_frame_equal(scanned_df, loaded_df)
+        np.testing.assert_array_equal(row_fingerprints(scanned_df), row_fingerprints(loaded_df))
+
+
+def test_typed_cells(tmp_path):
+    (_, df), = xlsx_scan.iter_xlsx_columns(_typed_workbook(tmp_path / 'typed.xlsx'), 'A:H')
+    first = df.iloc[0].tolist()
+    assert first[1] == datetime.datetime(2024, 5, 1, 8, 30)
+    assert first[2] == datetime.timedelta(hours=36, minutes=5)
+    assert first[3] == datetime.time(17, 45)
+    assert first[4] is True
+    assert first[5:7] == [2, '椅子x']
+    assert df['时长'].iloc[1] == datetime.timedelta(minutes=90)
+    assert df['错误'].iloc[2] == '#DIV/0!'
+
+
+def test_workbook_parts_are_parsed_once_per_digest(monkeypatch):
+    calls = []
+    read_shared_strings = xlsx_scan._read_shared_strings
+    monkeypatch.setattr(xlsx_scan, '_read_shared_strings', lambda zf: calls.append(1) or read_shared_strings(zf))
+    monkeypatch.setattr(xlsx_scan, '_parts_cache', type(xlsx_scan._parts_cache)())
+    digest = file_digest(TEST_FILE)
+
+    frames = {}
+    for sheet in xlsx_scan.list_sheets(TEST_FILE):
+        for name, df in xlsx_scan.iter_xlsx_columns(TEST_FILE, COLUMNS, sheets={sheet}, digest=digest):
+            frames[name] = df
+    assert len(frames) == 3
+    assert len(calls) == 1
+
+    list(xlsx_scan.iter_xlsx_columns(TEST_FILE, COLUMNS, digest='another version'))
+    list(xlsx_scan.iter_xlsx_columns(TEST_FILE, COLUMNS))
+    assert len(calls) == 3